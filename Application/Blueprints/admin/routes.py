@@ -0,0 +1,73 @@
+from flask import request, jsonify, Blueprint
+from Application.extensions import limiter, cache
+from Application.utils.rate_limits import configured_limit
+from Application.utils.cache_utils import invalidate_cache_pattern, response_l1, tag_l1
+from Application.utils.cache_stats import cache_stats
+from Application.utils.cache_backends import list_keys, delete_prefix
+from Application.utils.token_utils import admin_required, principal_cache, token_cache
+import os
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+# GET '/cache/stats' - Cache counters for the worker that answers the request
+@admin_bp.route('/cache/stats', methods=['GET'])
+@limiter.limit(configured_limit("30 per minute"))
+@admin_required
+def get_cache_stats():
+    stats = cache_stats().snapshot()
+    stats['worker_pid'] = os.getpid()
+    stats['backend'] = type(cache.cache).__name__
+    stats['l1'] = response_l1().stats()
+    stats['tags_l1'] = tag_l1().stats()
+    stats['principals'] = principal_cache().stats()
+    stats['tokens'] = token_cache().stats()
+
+    return jsonify(stats), 200
+
+# GET '/cache/keys?prefix=' - List keys in the shared backend by prefix
+@admin_bp.route('/cache/keys', methods=['GET'])
+@limiter.limit(configured_limit("30 per minute"))
+@admin_required
+def get_cache_keys():
+    prefix = request.args.get('prefix', '')
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+
+    keys = list_keys(cache.cache, prefix, limit)
+    if keys is None:
+        return jsonify({"error": f"{type(cache.cache).__name__} cannot list its keys"}), 501
+
+    return jsonify({"prefix": prefix, "count": len(keys), "keys": keys}), 200
+
+# POST '/cache/flush' - Invalidate resource tags and/or delete keys under a prefix
+@admin_bp.route('/cache/flush', methods=['POST'])
+@limiter.limit(configured_limit("10 per minute"))
+@admin_required
+def flush_cache():
+    data = request.get_json(silent=True) or {}
+    tags = data.get('tags', [])
+    prefix = data.get('prefix')
+
+    if not tags and not prefix:
+        return jsonify({"error": "Provide tags and/or prefix"}), 400
+    if not isinstance(tags, list) or not all(isinstance(tag, str) and tag for tag in tags):
+        return jsonify({"error": "tags must be a list of tag names"}), 400
+
+    invalidate_cache_pattern(*tags)
+
+    deleted = None
+    if prefix:
+        deleted = delete_prefix(cache.cache, prefix)
+        if deleted is None:
+            return jsonify({"error": f"{type(cache.cache).__name__} cannot delete by prefix"}), 501
+        # L1 entries follow the same keys, drop this worker's copies too
+        l1 = response_l1()
+        for key in l1.keys():
+            if key.startswith(prefix):
+                l1.delete(key)
+
+    return jsonify({"invalidated_tags": tags, "deleted_keys": deleted}), 200
+
+
+@admin_bp.errorhandler(429)
+def ratelimit_handler(e):
+    return jsonify(error="Rate limit exceeded", message=str(e.description)), 429
@@ -1,21 +1,47 @@
-from Application.Blueprints.customers.schemas import customer_schema, customers_schema, login_schema
+from Application.Blueprints.customers.schemas import customer_schema, customers_serializer, login_schema
 from flask import request, jsonify, Blueprint
 from marshmallow import ValidationError
-from sqlalchemy import select
+from sqlalchemy import select, func
+from sqlalchemy.orm import load_only
 from Application.models import Customers, Service_Tickets, db
-from Application.extensions import limiter, cache
-from Application.utils.cache_utils import cache_response
-from Application.utils.token_utils import encode_token, token_required
-from Application.Blueprints.service_tickets.schemas import tickets_schema
+from Application.extensions import limiter
+from Application.utils.rate_limits import configured_limit
+from Application.utils.cache_utils import cache_response, invalidate_cache_pattern
+from Application.utils.token_utils import encode_token, token_required, revoke_principal, restore_principal
+from Application.utils.db_utils import commit_or_conflict
+from Application.utils.password_utils import needs_rehash, HashingBusy
+from Application.utils.pagination import keyset_page, page_limit, InvalidCursor
+from Application.utils.serializers import wants_stream, InvalidFields
+from Application.Blueprints.service_tickets.schemas import tickets_serializer
 from werkzeug.security import generate_password_hash
 
 customers_bp = Blueprint('customers', __name__, url_prefix='/customers')
 
+# Error for each unique column, returned when an insert or update violates it
+UNIQUE_MESSAGES = {
+    'email': "Email already associated with an account",
+    'phone': "Phone number already associated with an account"
+}
+
 # GET /customers - Get all customers 
 @customers_bp.route('', methods=['GET'])
-@limiter.limit("10 per minute")
-@cache_response(timeout=300)
+@limiter.limit(configured_limit("10 per minute"))
+@cache_response(timeout=3600, tags=('customers',), streams=True)
 def get_customers():
+    # ?fields=id,name - only these fields are selected and returned
+    try:
+        serializer = customers_serializer.project(request.args.get('fields'))
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
+
+    # ?stream=1 or Accept: application/x-ndjson - every customer, one per line
+    if wants_stream():
+        return serializer.stream(serializer.select().order_by(Customers.id))
+
+    # ?after= / ?limit= switch to keyset (cursor) pagination
+    if 'after' in request.args or 'limit' in request.args:
+        return get_customers_by_cursor(serializer)
+
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 5, type=int)
 
@@ -24,13 +50,13 @@ def get_customers():
 
     # SQLAlchemy's paginate method
     paginated_customers = db.paginate(
-        select(Customers), page=page,
+        select(Customers).options(load_only(*serializer.columns)), page=page,
         per_page=per_page, error_out=False
     )
 
     # Format response with pagination metadata
     response_data = {
-        'customers': customers_schema.dump(paginated_customers.items),
+        'customers': serializer.schema.dump(paginated_customers.items),
         'pagination': {
             'page': paginated_customers.page,
             'pages': paginated_customers.pages,
@@ -44,12 +70,33 @@ def get_customers():
     }
 
     return jsonify(response_data), 200
+
+def get_customers_by_cursor(serializer):
+    """Keyset page ordered by id: no OFFSET, and COUNT(*) only with ?include_total=true"""
+    limit = page_limit(request.args.get('limit', type=int))
+
+    try:
+        rows, next_cursor = keyset_page(serializer.select(Customers.id), Customers.id, limit, request.args.get('after'))
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+
+    pagination = {
+        'limit': limit,
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor
+    }
+    if request.args.get('include_total', '').lower() in ('1', 'true'):
+        pagination['total'] = db.session.execute(select(func.count()).select_from(Customers)).scalar_one()
+
+    return jsonify({
+        'customers': serializer.dump(rows),
+        'pagination': pagination
+    }), 200
     
 # GET /customers/<id> - Get a specific customer by ID
 @customers_bp.route('/<int:customer_id>', methods=['GET'])
-@limiter.limit("20 per minute")
-@cache_response(timeout=600)
-@cache.memoize(timeout=60)
+@limiter.limit(configured_limit("20 per minute"))
+@cache_response(timeout=3600, tags=('customer:{customer_id}',))
 def get_customer(customer_id):
     customer = db.session.get(Customers, customer_id)
 
@@ -60,33 +107,33 @@ def get_customer(customer_id):
 
 # POST /customers - Create a new customer
 @customers_bp.route('', methods=['POST'])
-@limiter.limit("5 per minute")
+@limiter.limit(configured_limit("5 per minute"))
 def create_customer():
     try:
         customer_data = customer_schema.load(request.json)
     except ValidationError as e:
         return jsonify(e.messages), 400
     
-    query = select(Customers).where(Customers.email == customer_data.email) # Checking the db for a customer with this email
-    existing_customer = db.session.execute(query).scalars().all()
-    if existing_customer:
-        return jsonify({"error": "Email already associated with an account"}), 400
-    
     # Hash password before saving
     if 'password' in request.json:
         customer_data.set_password(request.json['password'])
     
     # new_customer = Customers(**customer_data)
+    # The unique constraints do the duplicate check, in the same round trip as the insert
     db.session.add(customer_data)
-    db.session.commit()
+    conflict = commit_or_conflict(UNIQUE_MESSAGES)
+    if conflict:
+        return conflict
 
-    cache.delete_memoized(get_customers)
+    # Ids can be reused after a delete, so make sure the new customer is not revoked
+    restore_principal(customer_data.id)
+    invalidate_cache_pattern('customers', f'customer:{customer_data.id}')
 
     return customer_schema.jsonify(customer_data), 201
 
 # PUT /customers/<id> - Update an existing customer
 @customers_bp.route('/<int:customer_id>', methods=['PUT'])
-@limiter.limit("10 per minute")
+@limiter.limit(configured_limit("10 per minute"))
 def update_customer(customer_id):
     customer = db.session.get(Customers, customer_id)
     if not customer:
@@ -102,17 +149,18 @@ def update_customer(customer_id):
     except ValidationError as e:
         return jsonify(e.messages), 400
 
-    db.session.commit()
+    conflict = commit_or_conflict(UNIQUE_MESSAGES)
+    if conflict:
+        return conflict
 
-    cache.delete_memoized(get_customers)
-    cache.delete_memoized(get_customer, customer_id)
+    invalidate_cache_pattern('customers', f'customer:{customer_id}')
 
     # Return the updated customer instance
     return customer_schema.jsonify(updated_customer), 200
 
 # DELETE /customers/<id> - Delete a customer
 @customers_bp.route('/<int:customer_id>', methods=['DELETE'])
-@limiter.limit("3 per minute")
+@limiter.limit(configured_limit("3 per minute"))
 def delete_customer(customer_id):
     customer = db.session.get(Customers, customer_id)
 
@@ -122,14 +170,16 @@ def delete_customer(customer_id):
     db.session.delete(customer)
     db.session.commit()
 
-    cache.delete_memoized(get_customers)
-    cache.delete_memoized(get_customer, customer_id)
+    # Outstanding tokens for this customer stop working on every worker
+    revoke_principal(customer_id)
+
+    invalidate_cache_pattern('customers', f'customer:{customer_id}', f'customer_tickets:{customer_id}')
 
     return jsonify({"message": f'Customer id: {customer_id}, successfully deleted'}), 200
 
 # POST /customers/login - Customer login
 @customers_bp.route('/login', methods=['POST'])
-@limiter.limit("5 per minute")
+@limiter.limit(configured_limit("5 per minute"))
 def login():
     # Check if request has JSON data
     if not request.is_json:
@@ -152,6 +202,11 @@ def login():
         # Return a message key to match tests
         return jsonify({"message": "Invalid email or password!"}), 401
 
+    # Upgrade hashes made with an older method or cost while we have the plain password
+    if needs_rehash(customer.password):
+        customer.set_password(login_data['password'])
+        db.session.commit()
+
     token = encode_token(customer.id)
 
     return jsonify({
@@ -164,19 +219,20 @@ def login():
 # GET /customers/my-tickets - Get all service tickets for the logged-in customer (requires token)
 @customers_bp.route('/my-tickets', methods=['GET'])
 @token_required
-@limiter.limit("10 per minute")
+@limiter.limit(configured_limit("10 per minute"))
+@cache_response(timeout=3600, tags=('customer_tickets:{principal}',), per_principal=True)
 def get_my_tickets(customer_id):
     # Query service tickets for this customer
-    query = select(Service_Tickets).where(Service_Tickets.customer_id == customer_id)
-    tickets = db.session.execute(query).scalars().all()
+    query = select(*tickets_serializer.columns).where(Service_Tickets.customer_id == customer_id)
+    tickets = db.session.execute(query).all()
 
-    return tickets_schema.jsonify(tickets), 200
+    return tickets_serializer.jsonify(tickets), 200
 
 
 # PUT /customers - Update currently authenticated customer (uses token)
 @customers_bp.route('', methods=['PUT'])
 @token_required
-@limiter.limit("10 per minute")
+@limiter.limit(configured_limit("10 per minute"))
 def update_current_customer(customer_id):
     customer = db.session.get(Customers, customer_id)
     if not customer:
@@ -193,10 +249,11 @@ def update_current_customer(customer_id):
     except ValidationError as e:
         return jsonify(e.messages), 400
 
-    db.session.commit()
+    conflict = commit_or_conflict(UNIQUE_MESSAGES)
+    if conflict:
+        return conflict
 
-    cache.delete_memoized(get_customers)
-    cache.delete_memoized(get_customer, customer_id)
+    invalidate_cache_pattern('customers', f'customer:{customer_id}')
 
     return customer_schema.jsonify(updated_customer), 200
 
@@ -204,3 +261,7 @@ def update_current_customer(customer_id):
 @customers_bp.errorhandler(429)
 def ratelimit_handler(e):
     return jsonify(error="Rate limit exceeded", message=str(e.description)), 429
+
+@customers_bp.errorhandler(HashingBusy)
+def hashing_busy_handler(e):
+    return jsonify(error="Server busy", message="Too many password checks in progress, retry shortly"), 503, {'Retry-After': '1'}
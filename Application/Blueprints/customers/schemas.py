@@ -1,6 +1,7 @@
 from Application.extensions import ma
 from Application.models import Customers
 from marshmallow import fields
+from Application.utils.serializers import RowSerializer
 
 class CustomerSchema(ma.SQLAlchemyAutoSchema):
     password = fields.Str(load_only=True, required=True)
@@ -16,4 +17,5 @@ class LoginSchema(ma.Schema):
 
 customer_schema = CustomerSchema()
 customers_schema = CustomerSchema(many=True)
+customers_serializer = RowSerializer(customers_schema)
 login_schema = LoginSchema()
\ No newline at end of file
@@ -1,17 +1,19 @@
-from .schemas import inventory_schema, inventories_schema
+from .schemas import inventory_schema, inventories_serializer
 from flask import request, jsonify, Blueprint
 from marshmallow import ValidationError
 from sqlalchemy import select
 from Application.models import Inventory, db
-from Application.extensions import limiter, cache
-from Application.utils.cache_utils import cache_response
-from Application.utils.cache_utils import cache_key_generator
+from Application.extensions import limiter
+from Application.utils.rate_limits import configured_limit
+from Application.utils.cache_utils import cache_response, invalidate_cache_pattern
+from Application.utils.pagination import keyset_page, page_limit, parse_sort, sort_order, with_next_page, PaginationError
+from Application.utils.serializers import wants_stream
 
 inventory_bp = Blueprint('inventory', __name__, url_prefix='/inventory')
 
 # POST '/' -Create a new inventory item
 @inventory_bp.route('', methods=['POST'])
-@limiter.limit("5 per minute")
+@limiter.limit(configured_limit("5 per minute"))
 def create_inventory():
     try:
         inventory_data = inventory_schema.load(request.json)
@@ -21,25 +23,43 @@ def create_inventory():
     db.session.add(inventory_data)
     db.session.commit()
 
-    cache.delete_memoized(get_all_inventory)
+    # The per-id tag too, in case this id was looked up (or deleted) before
+    invalidate_cache_pattern('inventory', f'inventory:{inventory_data.id}')
 
     return inventory_schema.jsonify(inventory_data), 201
 
-# GET '/' - Get all inventory items
+# GET '/' - Get inventory items, one keyset page at a time (or all of them as NDJSON)
 @inventory_bp.route('', methods=['GET'])
-@limiter.limit("15 per minute")
-@cache_response(timeout=300)
+@limiter.limit(configured_limit("15 per minute"))
+@cache_response(timeout=3600, tags=('inventory',), streams=True)
 def get_all_inventory():
-    query = select(Inventory)
-    inventory_items = db.session.execute(query).scalars().all()
+    # Optional filters are applied in SQL
+    query = select(*inventories_serializer.columns)
+    if request.args.get('name'):
+        query = query.where(Inventory.name.icontains(request.args['name'], autoescape=True))
+    min_price = request.args.get('min_price', type=float)
+    if min_price is not None:
+        query = query.where(Inventory.price >= min_price)
+    max_price = request.args.get('max_price', type=float)
+    if max_price is not None:
+        query = query.where(Inventory.price <= max_price)
 
-    return inventories_schema.jsonify(inventory_items), 200
+    try:
+        sort_column, descending = parse_sort(request.args.get('sort'), {'name': Inventory.name, 'price': Inventory.price})
+        # Streaming ignores ?limit= / ?after= and sends every matching row, one per line
+        if wants_stream():
+            return inventories_serializer.stream(query.order_by(*sort_order(Inventory.id, sort_column, descending)))
+        limit = page_limit(request.args.get('limit', type=int))
+        rows, next_cursor = keyset_page(query, Inventory.id, limit, request.args.get('after'), sort_column, descending)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return with_next_page(inventories_serializer.jsonify(rows), next_cursor, limit), 200
 
 # GET '/<int:id>' - Get a specific inventory item
 @inventory_bp.route('/<int:inventory_id>', methods=['GET'])
-@limiter.limit("20 per minute")
-@cache_response(timeout=600)
-@cache.memoize(timeout=60)
+@limiter.limit(configured_limit("20 per minute"))
+@cache_response(timeout=3600, tags=('inventory:{inventory_id}',))
 def get_inventory_item(inventory_id):
     inventory_item = db.session.get(Inventory, inventory_id)
 
@@ -49,7 +69,7 @@ def get_inventory_item(inventory_id):
 
 # PUT '/<int:id>' - Update an inventory item
 @inventory_bp.route('/<int:inventory_id>', methods=['PUT'])
-@limiter.limit("5 per minute")
+@limiter.limit(configured_limit("5 per minute"))
 def update_inventory(inventory_id):
     inventory_item = db.session.get(Inventory, inventory_id)
     if not inventory_item:
@@ -61,14 +81,14 @@ def update_inventory(inventory_id):
     
     db.session.commit()
 
-    cache.delete_memoized(get_all_inventory)
-    cache.delete_memoized(get_inventory_item, inventory_id)
+    # inventory:<id> also drops the cached total of every ticket using the part
+    invalidate_cache_pattern('inventory', f'inventory:{inventory_id}')
 
     return inventory_schema.jsonify(updated_inventory), 200
 
 # DELETE '/<int:id>' - Delete an inventory item
 @inventory_bp.route('/<int:inventory_id>', methods=['DELETE'])
-@limiter.limit("3 per minute")
+@limiter.limit(configured_limit("3 per minute"))
 def delete_inventory(inventory_id):
     inventory_item = db.session.get(Inventory, inventory_id)
 
@@ -78,22 +98,7 @@ def delete_inventory(inventory_id):
     db.session.delete(inventory_item)
     db.session.commit()
 
-    # Remove cached responses created by our custom cache_response decorator.
-    # cache_response stores cached data under a key equal to the request path
-    # (and query/hash for query params). Delete both the list and the item keys.
-    try:
-        # Delete the exact cache key used for this item (generated from the request)
-        item_cache_key = cache_key_generator()
-        cache.delete(item_cache_key)
-        # Also delete the list cache key (no view args)
-        cache.delete('/inventory')
-    except Exception:
-        # best-effort: continue even if cache backend doesn't support delete
-        pass
-
-    # Also attempt to clear any memoized entries (if used elsewhere)
-    cache.delete_memoized(get_all_inventory)
-    cache.delete_memoized(get_inventory_item, inventory_id)
+    invalidate_cache_pattern('inventory', f'inventory:{inventory_id}')
 
     return jsonify({"message": f'Inventory item id:{inventory_id}, successfully deleted'}), 200
 
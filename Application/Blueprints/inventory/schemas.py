@@ -1,6 +1,7 @@
 from Application.extensions import ma
 from Application.models import Inventory, Service_Inventory
 from marshmallow import fields
+from Application.utils.serializers import RowSerializer
 
 class InventorySchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -19,4 +20,5 @@ class ServiceInventorySchema(ma.SQLAlchemyAutoSchema):
 
 inventory_schema = InventorySchema()
 inventories_schema = InventorySchema(many=True)
+inventories_serializer = RowSerializer(inventories_schema)
 service_inventory_schema = ServiceInventorySchema()
\ No newline at end of file
@@ -1,48 +1,69 @@
-from .schemas import mechanic_schema, mechanics_schema
-from flask import request, jsonify, Blueprint
+from .schemas import mechanic_schema, mechanics_serializer
+from flask import request, jsonify, Blueprint, current_app
 from marshmallow import ValidationError
-from sqlalchemy import select, func
+from sqlalchemy import select
 from Application.models import db, Mechanics
-from Application.models import Service_Mechanics
-from Application.extensions import limiter, cache
-from Application.utils.cache_utils import cache_response
+from Application.extensions import limiter
+from Application.utils.rate_limits import configured_limit
+from Application.utils.cache_utils import cache_response, invalidate_cache_pattern
+from Application.utils.db_utils import commit_or_conflict
+from Application.utils.pagination import keyset_page, page_limit, parse_sort, with_next_page, PaginationError
 
 mechanics_bp = Blueprint('mechanics', __name__, url_prefix='/mechanics')
 
+# Error for each unique column, returned when an insert or update violates it
+UNIQUE_MESSAGES = {
+    'email': "Email already associated with an account",
+    'phone': "Phone number already associated with an account"
+}
+
 # POST'/' - Create a new Mechanic
 @mechanics_bp.route('', methods=['POST'])
-@limiter.limit("5 per minute")
+@limiter.limit(configured_limit("5 per minute"))
 def create_mechanic():
     try:
         mechanic_data = mechanic_schema.load(request.json)
     except ValidationError as e:
         return jsonify(e.messages), 400
     
-    query = select(Mechanics).where(Mechanics.email == mechanic_data.email)
-    existing_mechanic = db.session.execute(query).scalars().all()
-    if existing_mechanic:
-        return jsonify({"error": "Email already associated with an account"}), 400
-    
+    # The unique constraints do the duplicate check, in the same round trip as the insert
     db.session.add(mechanic_data)
-    db.session.commit()
+    conflict = commit_or_conflict(UNIQUE_MESSAGES)
+    if conflict:
+        return conflict
 
-    cache.delete_memoized(getAll_mechanics)
+    invalidate_cache_pattern('mechanics')
 
     return mechanic_schema.jsonify(mechanic_data), 201
 
-# GET'/' - Retrieve all Mechanics
+# GET'/' - Retrieve Mechanics, one keyset page at a time
 @mechanics_bp.route('', methods=['GET'])
-@limiter.limit("10 per minute")
-@cache_response(timeout=300)
+@limiter.limit(configured_limit("10 per minute"))
+@cache_response(timeout=3600, tags=('mechanics',))
 def getAll_mechanics():
-    query = select(Mechanics)
-    mechanics = db.session.execute(query).scalars().all()
+    # Optional filters are applied in SQL
+    query = select(*mechanics_serializer.columns)
+    if request.args.get('name'):
+        query = query.where(Mechanics.name.icontains(request.args['name'], autoescape=True))
+    min_salary = request.args.get('min_salary', type=float)
+    if min_salary is not None:
+        query = query.where(Mechanics.salary >= min_salary)
+    max_salary = request.args.get('max_salary', type=float)
+    if max_salary is not None:
+        query = query.where(Mechanics.salary <= max_salary)
+
+    try:
+        sort_column, descending = parse_sort(request.args.get('sort'), {'name': Mechanics.name, 'salary': Mechanics.salary})
+        limit = page_limit(request.args.get('limit', type=int))
+        rows, next_cursor = keyset_page(query, Mechanics.id, limit, request.args.get('after'), sort_column, descending)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return mechanics_schema.jsonify(mechanics)
+    return with_next_page(mechanics_serializer.jsonify(rows), next_cursor, limit)
 
 # PUT'/<int:id>' - Updates a specific mechanic
 @mechanics_bp.route('/<int:mechanic_id>', methods=['PUT'])
-@limiter.limit("5 per minute")
+@limiter.limit(configured_limit("5 per minute"))
 def update_mechanic(mechanic_id):
     mechanic = db.session.get(Mechanics, mechanic_id)
     if not mechanic:
@@ -53,16 +74,18 @@ def update_mechanic(mechanic_id):
     except ValidationError as e:
         return jsonify(e.messages), 400
 
-    db.session.commit()
+    conflict = commit_or_conflict(UNIQUE_MESSAGES)
+    if conflict:
+        return conflict
 
-    cache.delete_memoized(getAll_mechanics)
+    invalidate_cache_pattern('mechanics')
 
     return jsonify(mechanic_schema.dump(updated_mechanic)), 200
 
 
 # DELETE'/<int:id>' - Deletes a specific mechanic based on ID passed
 @mechanics_bp.route('/<int:mechanic_id>', methods=['DELETE'])
-@limiter.limit("3 per minute")
+@limiter.limit(configured_limit("3 per minute"))
 def delete_mechanic(mechanic_id):
     mechanic = db.session.get(Mechanics, mechanic_id)
 
@@ -72,31 +95,29 @@ def delete_mechanic(mechanic_id):
     db.session.delete(mechanic)
     db.session.commit()
 
-    cache.delete_memoized(getAll_mechanics)
+    invalidate_cache_pattern('mechanics')
     return jsonify({"message": f'Mechanic id: {mechanic_id}, successfully deleted'}), 200
 
 # GET '/ranking' - Get mechanics order by most tickets worked on
 @mechanics_bp.route('/ranking', methods=['GET'])
-@limiter.limit("10 per minute")
-@cache_response(timeout=600)
+@limiter.limit(configured_limit("10 per minute"))
+@cache_response(timeout=3600, tags=('mechanics', 'mechanic_ranking'))
 def get_mechanic_ranking():
-    # Query mechanics with ticket count, ordered by ticket count descending
-    query = (
-        select(
-            Mechanics, func.count(Service_Mechanics.mechanic_id).label('ticket_count')
-        )
-        .outerjoin(Service_Mechanics, Mechanics.id == Service_Mechanics.mechanic_id)
-        .group_by(Mechanics.id)
-        .order_by(func.count(Service_Mechanics.mechanic_id).desc())
-    )
-
-    results = db.session.execute(query).all()
+    # ticket_count is kept current by the ticket routes, so this is an indexed ORDER BY
+    query = select(*mechanics_serializer.columns, Mechanics.ticket_count).order_by(Mechanics.ticket_count.desc(), Mechanics.id)
+
+    # ?limit= returns only the top K mechanics
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit > 0:
+        query = query.limit(min(limit, current_app.config.get('PAGINATION_MAX_LIMIT', 100)))
+
+    rows = db.session.execute(query).all()
 
     # Format the response to include ticket count
     ranking_data = []
-    for mechanic, ticket_count in results:
-        mechanic_data = mechanic_schema.dump(mechanic)
-        mechanic_data['tickets_worked_on'] = ticket_count
+    for row in rows:
+        mechanic_data = mechanics_serializer.to_dict(row)
+        mechanic_data['tickets_worked_on'] = row.ticket_count
         ranking_data.append(mechanic_data)
     return jsonify(ranking_data), 200
 
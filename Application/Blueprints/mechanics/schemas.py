@@ -1,11 +1,15 @@
 from Application.extensions import ma
 from Application.models import Mechanics
+from Application.utils.serializers import RowSerializer
 
 class MechanicSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Mechanics
         load_instance = True
         include_relationships = False
+        # Maintained by the server for the ranking, never loaded from or shown to clients
+        exclude = ('ticket_count',)
 
 mechanic_schema = MechanicSchema()
-mechanics_schema = MechanicSchema(many=True)
\ No newline at end of file
+mechanics_schema = MechanicSchema(many=True)
+mechanics_serializer = RowSerializer(mechanics_schema)
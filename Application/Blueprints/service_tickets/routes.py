@@ -1,31 +1,78 @@
-from .schemas import ticket_schema, tickets_schema
-from flask import request, jsonify, Blueprint
+from .schemas import ticket_schema, tickets_serializer
+from Application.Blueprints.mechanics.schemas import mechanic_schema
+from Application.Blueprints.inventory.schemas import inventory_schema
+from flask import request, jsonify, Blueprint, current_app
 from marshmallow import ValidationError
-from sqlalchemy import select
+from sqlalchemy import select, delete
+from sqlalchemy.orm import load_only, selectinload
+from datetime import date
 from Application.models import Service_Tickets, Mechanics, Service_Mechanics, Inventory, Service_Inventory, db
-from Application.extensions import limiter, cache
-from Application.utils.cache_utils import cache_response
+from Application.extensions import limiter
+from Application.utils.rate_limits import configured_limit
+from Application.utils.cache_utils import cache_response, invalidate_cache_pattern
+from Application.utils.db_utils import upsert, insert_ignore, insert_ignore_many, delete_returning, commit_or_conflict
+from Application.utils.ticket_totals import ticket_totals, invalidate_ticket_totals
+from Application.utils.pagination import keyset_page, page_limit, parse_sort, sort_order, with_next_page, PaginationError
+from Application.utils.serializers import wants_stream, parse_expand, InvalidFields, InvalidExpand
 
 tickets_bp = Blueprint('service_tickets', __name__, url_prefix='/service-tickets')
 
+# Error for each unique column, returned when an insert violates it
+UNIQUE_MESSAGES = {'VIN': "VIN already associated with a service ticket"}
+
+# ?expand= names, each loaded for a whole page of tickets by one extra query
+EXPANSIONS = {
+    'mechanics': selectinload(Service_Tickets.service_mechanics).joinedload(Service_Mechanics.mechanics),
+    'parts': selectinload(Service_Tickets.service_inventory).joinedload(Service_Inventory.inventory)
+}
+
+# Cache tags of each expansion, whose rows can change without touching the ticket
+EXPANSION_TAGS = {'mechanics': 'mechanics', 'parts': 'inventory'}
+
+def expansion_tags(default=''):
+    """Cache tags for a ticket response, given the expand value used when none is passed"""
+    def tags():
+        names = request.args.get('expand', default).split(',')
+        return ['tickets', *sorted({EXPANSION_TAGS[name.strip()] for name in names if name.strip() in EXPANSION_TAGS})]
+    return tags
+
+def date_arg(name):
+    """?name=YYYY-MM-DD as a date, or None when absent; a malformed value raises ValueError"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+def dump_ticket(ticket, schema, expand):
+    """Ticket dict with the expanded mechanics and parts, read from already-loaded relationships"""
+    data = schema.dump(ticket, many=False)
+    if 'mechanics' in expand:
+        mechanics = sorted((link.mechanics for link in ticket.service_mechanics), key=lambda m: m.id)
+        data['mechanics'] = [mechanic_schema.dump(mechanic) for mechanic in mechanics]
+    if 'parts' in expand:
+        links = sorted(ticket.service_inventory, key=lambda link: link.inventory_id)
+        data['parts'] = [{**inventory_schema.dump(link.inventory), 'quantity': link.quantity} for link in links]
+    return data
+
 # POST '' - Passes in required information to create a service ticket
 @tickets_bp.route('', methods=['POST'])
-@limiter.limit("5 per minute")
+@limiter.limit(configured_limit("5 per minute"))
 def create_ticket():
     try:
         ticket_data = ticket_schema.load(request.json)
     except ValidationError as e:
         return jsonify(e.messages), 400
     
-    query = select(Service_Tickets).where(Service_Tickets.VIN == ticket_data.VIN)
-    existing_ticket = db.session.execute(query).scalars().all()
-    if existing_ticket:
-        return jsonify({"error": "VIN already associated with a service ticket"}), 400
-    
+    # The unique constraint on VIN does the duplicate check, in the same round trip as the insert
     db.session.add(ticket_data)
-    db.session.commit()
+    conflict = commit_or_conflict(UNIQUE_MESSAGES)
+    if conflict:
+        return conflict
 
-    cache.delete_memoized(getAll_tickets)
+    invalidate_cache_pattern('tickets', f'customer_tickets:{ticket_data.customer_id}')
 
     return ticket_schema.jsonify(ticket_data), 201
 
@@ -33,7 +80,7 @@ def create_ticket():
 # PUT '/<ticket_id>/assign-mechanic/<mechanic-id>' -  
 #       Adds a relationship between a service ticket and a mechanic (use relationship attributes)
 @tickets_bp.route('/<int:ticket_id>/assign-mechanic/<int:mechanic_id>', methods=['PUT'])
-@limiter.limit("10 per minute")
+@limiter.limit(configured_limit("10 per minute"))
 def assign_mechanic(ticket_id, mechanic_id):
     ticket = db.session.get(Service_Tickets, ticket_id)
     mechanic = db.session.get(Mechanics, mechanic_id)
@@ -43,30 +90,23 @@ def assign_mechanic(ticket_id, mechanic_id):
     if not mechanic:
         return jsonify({"error": "Mechanic not found"}), 404
 
-    # Check if the relationship already exists
-    existing_relationship = db.session.execute(
-        select(Service_Mechanics).where(
-            Service_Mechanics.ticket_id == ticket_id,
-            Service_Mechanics.mechanic_id == mechanic_id
-        )
-    ).scalars().first()
-
-    if existing_relationship:
+    # One atomic INSERT that skips an existing pair, so concurrent assigns cannot double count
+    inserted = insert_ignore(Service_Mechanics, {"ticket_id": ticket_id, "mechanic_id": mechanic_id},
+                             conflict_columns=['ticket_id', 'mechanic_id'])
+    if not inserted:
         return jsonify({"error": "Mechanic already assigned to this service ticket"}), 400
 
-    # Create the relationship
-    service_mechanic = Service_Mechanics(ticket_id=ticket_id, mechanic_id=mechanic_id)
-    db.session.add(service_mechanic)
+    Mechanics.adjust_ticket_counts([mechanic_id], 1)
     db.session.commit()
 
-    cache.delete_memoized(getAll_tickets)
+    invalidate_cache_pattern('tickets', 'mechanic_ranking', f'customer_tickets:{ticket.customer_id}')
 
     return jsonify({"message": f"Mechanic id: {mechanic_id} assigned to Service Ticket id: {ticket_id}"}), 200
 
 
 # PUT '/<ticket_id>/remove-mechanic/<mechanic-id>' - Removes the relationship from the service ticket & mechanic.
 @tickets_bp.route('/<int:ticket_id>/remove-mechanic/<int:mechanic_id>', methods=['PUT'])
-@limiter.limit("10 per minute")
+@limiter.limit(configured_limit("10 per minute"))
 def remove_mechanic(ticket_id, mechanic_id):
     ticket = db.session.get(Service_Tickets, ticket_id)
     mechanic = db.session.get(Mechanics, mechanic_id)
@@ -89,25 +129,89 @@ def remove_mechanic(ticket_id, mechanic_id):
 
     # Remove the relationship
     db.session.delete(service_mechanic)
+    Mechanics.adjust_ticket_counts([mechanic_id], -1)
     db.session.commit()
 
-    cache.delete_memoized(getAll_tickets)
+    invalidate_cache_pattern('tickets', 'mechanic_ranking', f'customer_tickets:{ticket.customer_id}')
 
     return jsonify({"message": f"Mechanic id: {mechanic_id} removed from Service Ticket id: {ticket_id}"}), 200
 
-# GET '' - Retrieves all service tickets
+# GET '' - Retrieves service tickets, one keyset page at a time
 @tickets_bp.route('', methods=['GET'])
-@limiter.limit("15 per minute")
-@cache_response(timeout=300)
+@limiter.limit(configured_limit("15 per minute"))
+@cache_response(timeout=3600, tags=expansion_tags(), streams=True)
 def getAll_tickets():
-    query = select(Service_Tickets)
-    tickets = db.session.execute(query).scalars().all()
+    try:
+        serializer = tickets_serializer.project(request.args.get('fields'))
+        expand = parse_expand(request.args.get('expand'), EXPANSIONS)
+        sort_column, descending = parse_sort(request.args.get('sort'), {
+            'service_date': Service_Tickets.service_date,
+            'customer_id': Service_Tickets.customer_id
+        })
+    except (InvalidFields, InvalidExpand, PaginationError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    if expand:
+        # Ticket entities with each expansion eager-loaded: one query for the page, one per expansion
+        cursor_columns = [column for column in (Service_Tickets.id, sort_column) if column is not None]
+        query = select(Service_Tickets).options(
+            load_only(*serializer.columns, *cursor_columns), *(EXPANSIONS[name] for name in sorted(expand))
+        )
+    else:
+        # Only the requested fields are read, plus the columns the cursor is built from
+        query = serializer.select(Service_Tickets.id, sort_column)
+
+    # Optional filters are applied in SQL
+    customer_id = request.args.get('customer_id', type=int)
+    if customer_id is not None:
+        query = query.where(Service_Tickets.customer_id == customer_id)
+    # Dates are real DATE columns, so the range uses the service_date index
+    try:
+        date_from = date_arg('service_date_from')
+        date_to = date_arg('service_date_to')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if date_from is not None:
+        query = query.where(Service_Tickets.service_date >= date_from)
+    if date_to is not None:
+        query = query.where(Service_Tickets.service_date <= date_to)
+
+    # NDJSON export: every matching ticket in sort order, no page limit
+    if wants_stream():
+        if expand:
+            return jsonify({"error": "expand cannot be combined with streaming"}), 400
+        return serializer.stream(query.order_by(*sort_order(Service_Tickets.id, sort_column, descending)))
 
-    return tickets_schema.jsonify(tickets)
+    try:
+        limit = page_limit(request.args.get('limit', type=int))
+        rows, next_cursor = keyset_page(query, Service_Tickets.id, limit, request.args.get('after'), sort_column, descending)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if expand:
+        return with_next_page(jsonify([dump_ticket(ticket, serializer.schema, expand) for (ticket,) in rows]), next_cursor, limit)
+    return with_next_page(serializer.jsonify(rows), next_cursor, limit)
+
+# GET '/<int:ticket_id>' - One service ticket with its mechanics and parts (?expand= picks which)
+@tickets_bp.route('/<int:ticket_id>', methods=['GET'])
+@limiter.limit(configured_limit("20 per minute"))
+@cache_response(timeout=3600, tags=expansion_tags('mechanics,parts'))
+def get_ticket(ticket_id):
+    try:
+        expand = parse_expand(request.args.get('expand', 'mechanics,parts'), EXPANSIONS)
+    except InvalidExpand as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = select(Service_Tickets).where(Service_Tickets.id == ticket_id)
+    ticket = db.session.execute(query.options(*(EXPANSIONS[name] for name in sorted(expand)))).scalar_one_or_none()
+    if not ticket:
+        return jsonify({"error": "Service Ticket not found"}), 404
+
+    return jsonify(dump_ticket(ticket, ticket_schema, expand)), 200
 
 # PUT '/<int:ticket_id>/edit' - Add and remove mechanics from service ticket
 @tickets_bp.route('/<int:ticket_id>/edit', methods=['PUT'])
-@limiter.limit("5 per minute")
+@limiter.limit(configured_limit("5 per minute"))
 def edit_ticket_mechanics(ticket_id):
     ticket = db.session.get(Service_Tickets, ticket_id)
     if not ticket:
@@ -119,53 +223,48 @@ def edit_ticket_mechanics(ticket_id):
     
     remove_ids = data.get('remove_ids', [])
     add_ids = data.get('add_ids', [])
-
-    # Remove mechanics
+    for ids in (remove_ids, add_ids):
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify({"error": "remove_ids and add_ids must be lists of mechanic ids"}), 400
+    # Drop duplicates but keep the caller's order
+    remove_ids, add_ids = list(dict.fromkeys(remove_ids)), list(dict.fromkeys(add_ids))
+
+    # Validate everything before changing anything
+    existing = set(db.session.execute(select(Mechanics.id).where(Mechanics.id.in_(add_ids))).scalars())
+    missing = [mechanic_id for mechanic_id in add_ids if mechanic_id not in existing]
+    if missing:
+        return jsonify({"error": f"Mechanics with ids {missing} not found"}), 404
+
+    # Counters follow the rows each statement actually changed, so a concurrent
+    # assign or remove of the same pair is never counted twice
+    deleted = set()
     if remove_ids:
-        for mechanic_id in remove_ids:
-            # Find the relationship
-            service_mechanic = db.session.execute(
-                select(Service_Mechanics).where(
-                    Service_Mechanics.ticket_id == ticket_id,
-                    Service_Mechanics.mechanic_id == mechanic_id,
-                )
-            ).scalars().first()
-
-            if service_mechanic:
-                db.session.delete(service_mechanic)
-    
-    # Add mechanics
-    if add_ids:
-        for mechanic_id in add_ids:
-            # Verify mechanic exists
-            mechanic = db.session.get(Mechanics, mechanic_id)
-            if not mechanic:
-                return jsonify({"error": f"Mechanic with id {mechanic_id} not found"}), 404
-            
-            # Check if relationship already exists
-            existing_relationship = db.session.execute(
-                select(Service_Mechanics).where(
-                    Service_Mechanics.ticket_id == ticket_id,
-                    Service_Mechanics.mechanic_id == mechanic_id
-                )
-            ).scalars().first()
-
-            if not existing_relationship:
-                service_mechanic = Service_Mechanics(ticket_id=ticket_id, mechanic_id=mechanic_id)
-                db.session.add(service_mechanic)
-    
+        deleted.update(delete_returning(
+            Service_Mechanics, Service_Mechanics.mechanic_id,
+            Service_Mechanics.ticket_id == ticket_id, Service_Mechanics.mechanic_id.in_(remove_ids)
+        ))
+    removed_ids = [mechanic_id for mechanic_id in remove_ids if mechanic_id in deleted]
+    inserted = set(insert_ignore_many(
+        Service_Mechanics, [{"ticket_id": ticket_id, "mechanic_id": mechanic_id} for mechanic_id in add_ids],
+        conflict_columns=['ticket_id', 'mechanic_id'], returning=Service_Mechanics.mechanic_id
+    ))
+    added_ids = [mechanic_id for mechanic_id in add_ids if mechanic_id in inserted]
+
+    # Keep the ranking counters in step, in the same transaction
+    Mechanics.adjust_ticket_counts(removed_ids, -1)
+    Mechanics.adjust_ticket_counts(added_ids, 1)
     db.session.commit()
-    cache.delete_memoized(getAll_tickets)
+    invalidate_cache_pattern('tickets', 'mechanic_ranking', f'customer_tickets:{ticket.customer_id}')
 
     return jsonify({
         "message": f"Ticket {ticket_id} mechanics updated successfully",
-        "removed_mechanics": remove_ids,
-        "added_mechanics": add_ids
+        "removed_mechanics": removed_ids,
+        "added_mechanics": added_ids
     }), 200
 
 # POST '/<int:ticket_id>/add-part' - Add a part to the service ticket
 @tickets_bp.route('/<int:ticket_id>/add-part', methods=['POST'])
-@limiter.limit("10 per minute")
+@limiter.limit(configured_limit("10 per minute"))
 def add_part_to_ticket(ticket_id):
     ticket = db.session.get(Service_Tickets, ticket_id)
     if not ticket:
@@ -180,45 +279,81 @@ def add_part_to_ticket(ticket_id):
 
     if not inventory_id:
         return jsonify({"error": "inventory_id is required"}), 400
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+        return jsonify({"error": "quantity must be a positive integer"}), 400
     
     # Verify inventory item exists
     inventory_item = db.session.get(Inventory, inventory_id)
     if not inventory_item:
         return jsonify({"error": "Inventory item not found"}), 404
     
-    # Check if this part is already associated with the ticket
-    existing_relationship = db.session.execute(
-        select(Service_Inventory).where(
-            Service_Inventory.ticket_id == ticket_id,
-            Service_Inventory.inventory_id == inventory_id
-        )
-    ).scalars().first()
-
-    if existing_relationship:
-        # Update quantity if relationship exists
-        existing_relationship.quantity += quantity
-        message = f"Updated quantity for part '{inventory_item.name}' on ticket {ticket_id}"
-    else:
-        # Create new relationship
-        service_inventory = Service_Inventory(
-            ticket_id=ticket_id,
-            inventory_id=inventory_id,
-            quantity=quantity
-        )
-        db.session.add(service_inventory)
-        message = f"Added part '{inventory_item.name}' to ticket {ticket_id}"
-
+    # Insert the part or add to its quantity in one atomic statement
+    upsert(Service_Inventory, {"ticket_id": ticket_id, "inventory_id": inventory_id, "quantity": quantity},
+           conflict_columns=['ticket_id', 'inventory_id'], increment=['quantity'])
     db.session.commit()
-    cache.delete_memoized(getAll_tickets)
+    invalidate_cache_pattern('tickets', f'customer_tickets:{ticket.customer_id}')
+    invalidate_ticket_totals([ticket_id])
 
     return jsonify({
-        "message": message,
+        "message": f"Added {quantity} x part '{inventory_item.name}' to ticket {ticket_id}",
         "part_name": inventory_item.name,
         "quantity": quantity,
         "part_price": inventory_item.price
     }), 200
 
 
+# DELETE '/<int:ticket_id>' - Delete a service ticket along with its mechanic and part links
+@tickets_bp.route('/<int:ticket_id>', methods=['DELETE'])
+@limiter.limit(configured_limit("5 per minute"))
+def delete_ticket(ticket_id):
+    ticket = db.session.get(Service_Tickets, ticket_id)
+    if not ticket:
+        return jsonify({"error": "Service Ticket not found"}), 404
+
+    # Only the links this delete removed are taken off the counters
+    mechanic_ids = delete_returning(Service_Mechanics, Service_Mechanics.mechanic_id,
+                                    Service_Mechanics.ticket_id == ticket_id)
+    db.session.execute(delete(Service_Inventory).where(Service_Inventory.ticket_id == ticket_id))
+    Mechanics.adjust_ticket_counts(mechanic_ids, -1)
+    db.session.delete(ticket)
+    db.session.commit()
+
+    invalidate_cache_pattern('tickets', 'mechanic_ranking', f'customer_tickets:{ticket.customer_id}')
+    invalidate_ticket_totals([ticket_id])
+
+    return jsonify({"message": f'Service Ticket id: {ticket_id}, successfully deleted'}), 200
+
+# GET '/<int:ticket_id>/total' - Parts cost of one service ticket
+@tickets_bp.route('/<int:ticket_id>/total', methods=['GET'])
+@limiter.limit(configured_limit("20 per minute"))
+def get_ticket_total(ticket_id):
+    totals = ticket_totals([ticket_id])
+    if ticket_id not in totals:
+        return jsonify({"error": "Service Ticket not found"}), 404
+    return jsonify({"ticket_id": ticket_id, "total": totals[ticket_id]}), 200
+
+# GET '/totals?ids=1,2,3' - Parts cost of many service tickets, summed in one grouped query
+@tickets_bp.route('/totals', methods=['GET'])
+@limiter.limit(configured_limit("10 per minute"))
+def get_ticket_totals():
+    try:
+        ticket_ids = list(dict.fromkeys(int(value) for value in request.args.get('ids', '').split(',') if value.strip()))
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of ticket ids"}), 400
+    if not ticket_ids:
+        return jsonify({"error": "ids is required"}), 400
+
+    max_ids = current_app.config.get('PAGINATION_MAX_LIMIT', 100)
+    if len(ticket_ids) > max_ids:
+        return jsonify({"error": f"At most {max_ids} ids per request"}), 400
+
+    totals = ticket_totals(ticket_ids)
+    return jsonify({
+        "totals": [{"ticket_id": ticket_id, "total": total} for ticket_id, total in totals.items()],
+        "not_found": [ticket_id for ticket_id in ticket_ids if ticket_id not in totals]
+    }), 200
+
+
 # Error handling
 @tickets_bp.errorhandler(429)
 def ratelimit_handler(e):
@@ -1,5 +1,6 @@
 from Application.extensions import ma
 from Application.models import Service_Tickets
+from Application.utils.serializers import RowSerializer
 
 class Service_TicketSchema(ma.SQLAlchemyAutoSchema):
     customer_id = ma.Integer(required=True)
@@ -9,4 +10,5 @@ class Service_TicketSchema(ma.SQLAlchemyAutoSchema):
         include_relationships = False
 
 ticket_schema = Service_TicketSchema()
-tickets_schema = Service_TicketSchema(many=True)
\ No newline at end of file
+tickets_schema = Service_TicketSchema(many=True)
+tickets_serializer = RowSerializer(tickets_schema)
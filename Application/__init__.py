@@ -5,6 +5,10 @@ from Application.Blueprints.customers.routes import customers_bp
 from Application.Blueprints.mechanics.routes import mechanics_bp
 from Application.Blueprints.service_tickets.routes import tickets_bp
 from Application.Blueprints.inventory.routes import inventory_bp
+from Application.Blueprints.admin.routes import admin_bp
+from Application.utils.read_replicas import pin_after_write
+from Application.utils import password_utils
+from Application.utils.rate_limits import init_storage
 
 from flask_swagger_ui import get_swaggerui_blueprint
 
@@ -24,14 +28,22 @@ def create_app(config_name):
     # Initialize extensions
     ma.init_app(app)
     db.init_app(app)
+    init_storage(app)
     limiter.init_app(app)
     cache.init_app(app)
 
+    # Password hashing pool, if PASSWORD_HASH_WORKERS is set
+    password_utils.init_app(app)
+
+    # Read-your-writes pinning for replica routing
+    app.after_request(pin_after_write)
+
     # Register blueprints
     app.register_blueprint(customers_bp)
     app.register_blueprint(mechanics_bp)
     app.register_blueprint(tickets_bp)
     app.register_blueprint(inventory_bp)
+    app.register_blueprint(admin_bp)
     app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
     return app
\ No newline at end of file
@@ -2,7 +2,11 @@ from flask_marshmallow import Marshmallow
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
+# Imported for its side effect: registers the sqlite:// rate-limit storage
+from Application.utils import rate_limits
 
 ma = Marshmallow()
+# Storage (RATELIMIT_STORAGE_URI) and strategy (RATELIMIT_STRATEGY) are chosen per config class, see config.py
 limiter = Limiter(key_func=get_remote_address)
-cache = Cache(config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 300})
\ No newline at end of file
+# Backend is chosen per config class (CACHE_TYPE), see config.py
+cache = Cache()
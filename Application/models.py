@@ -1,15 +1,18 @@
 from flask import Flask
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, text, update
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, validates
+from datetime import date
+from Application.utils.password_utils import hash_password, verify_password
+from Application.utils.read_replicas import RoutingSession
 
 # Create a base class for the modules
 class Base(DeclarativeBase):
     pass
 
 # Instantiate the SQLAlchemy db
-db = SQLAlchemy(model_class=Base)
+# Reads of GET requests may be routed to a replica, see READ_REPLICAS in config.py
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
 
 # Create Customer table
 class Customers(Base):
@@ -25,12 +28,12 @@ class Customers(Base):
     service_tickets: Mapped[list["Service_Tickets"]] = relationship("Service_Tickets", back_populates="customer")
 
     def set_password(self, password):
-        """Set the customer's password (hashing can be added here)"""
-        self.password = generate_password_hash(password)
+        """Set the customer's password, hashed with PASSWORD_HASH_METHOD"""
+        self.password = hash_password(password)
 
     def check_password(self, password):
         """Check if provided password matched the hash"""
-        return check_password_hash(self.password, password)
+        return verify_password(self.password, password)
 
 # Service Tickets table
 class Service_Tickets(Base):
@@ -38,11 +41,11 @@ class Service_Tickets(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     VIN: Mapped[str] = mapped_column(db.String(360), nullable=False, unique=True)
-    service_date: Mapped[str] = mapped_column(db.String(360), nullable=False)
+    service_date: Mapped[date] = mapped_column(db.Date, nullable=False, index=True)
     service_desc: Mapped[str] = mapped_column(db.String(255), nullable=False)
 
-    # ForeignKey Constraint
-    customer_id: Mapped[int] = mapped_column(ForeignKey('customers.id'), nullable=False)
+    # ForeignKey Constraint (indexed for per-customer ticket lookups)
+    customer_id: Mapped[int] = mapped_column(ForeignKey('customers.id'), nullable=False, index=True)
 
     # Relationships
     customer: Mapped["Customers"] = relationship("Customers", back_populates="service_tickets")
@@ -50,9 +53,18 @@ class Service_Tickets(Base):
         # Relationsip to junction table
     service_inventory: Mapped[list["Service_Inventory"]] = relationship("Service_Inventory", back_populates="ticket")
 
+    @validates('service_date')
+    def validate_service_date(self, key, value):
+        """Accept ISO 'YYYY-MM-DD' strings as well as date objects"""
+        if isinstance(value, str):
+            return date.fromisoformat(value)
+        return value
+
 # Service Mechanics table (Junction table for many-to-many relationship)
 class Service_Mechanics(Base):
     __tablename__ = 'service_mechanics'
+    # The composite PK leads with ticket_id; lookups by mechanic need their own index
+    __table_args__ = (Index('ix_service_mechanics_mechanic_id', 'mechanic_id'),)
 
     ticket_id: Mapped[int] = mapped_column(primary_key=True)
     mechanic_id: Mapped[int] = mapped_column(primary_key=True)
@@ -68,6 +80,8 @@ class Service_Mechanics(Base):
 # Mechanics table
 class Mechanics(Base):
     __tablename__ = 'mechanics'
+    # Serves the ranking's ORDER BY ticket_count DESC, id straight from the index
+    __table_args__ = (Index('ix_mechanics_ticket_count', text('ticket_count DESC'), 'id'),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(db.String(255), nullable=False)
@@ -75,9 +89,24 @@ class Mechanics(Base):
     phone: Mapped[str] = mapped_column(db.String(360), nullable=False, unique=True)
     salary: Mapped[float] = mapped_column(nullable=False)
 
+    # Number of Service_Mechanics rows for this mechanic, maintained by adjust_ticket_counts
+    ticket_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default='0')
+
     # Relationship: One mechanic can work on many service tickets
     service_mechanics: Mapped[list["Service_Mechanics"]] = relationship("Service_Mechanics", back_populates="mechanics")
 
+    @staticmethod
+    def adjust_ticket_counts(mechanic_ids, delta):
+        """Shift ticket_count for these mechanics; runs in the caller's transaction"""
+        if not mechanic_ids:
+            return
+        db.session.execute(
+            update(Mechanics)
+            .where(Mechanics.id.in_(mechanic_ids))
+            .values(ticket_count=Mechanics.ticket_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
 # Inventory table
 class Inventory(Base):
     __tablename__ = 'inventory'
@@ -92,6 +121,8 @@ class Inventory(Base):
 # Junction table for Service_Tickets <--> Inventory (Many-to-Many)
 class Service_Inventory(Base):
     __tablename__ = 'service_inventory'
+    # The composite PK leads with ticket_id; lookups by part need their own index
+    __table_args__ = (Index('ix_service_inventory_inventory_id', 'inventory_id'),)
 
     # Composite Primary Key
     ticket_id: Mapped[int] = mapped_column(ForeignKey('service_tickets.id'), primary_key=True)
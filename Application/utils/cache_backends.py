@@ -0,0 +1,301 @@
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.rediscache import RedisCache
+from fnmatch import fnmatchcase
+from Application.utils.sqlite_files import thread_connection
+import os, pickle, threading, time
+
+class SQLiteCache(BaseCache):
+    """Cache stored in one SQLite file, shared by every worker process on the host"""
+
+    # Expired rows are swept after this many writes
+    PRUNE_INTERVAL = 500
+
+    def __init__(self, path, default_timeout=300, key_prefix=''):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.key_prefix = key_prefix or ''
+        self._local = threading.local()
+        self._writes = 0
+
+        self._conn().execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+        )
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        path = config.get('CACHE_SQLITE_PATH') or os.path.join(app.instance_path, 'cache.sqlite3')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        kwargs['key_prefix'] = config.get('CACHE_KEY_PREFIX')
+        return cls(path, *args, **kwargs)
+
+    def _conn(self):
+        return thread_connection(self._local, self.path)
+
+    def _expires(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return None if timeout == 0 else time.time() + timeout
+
+    def _after_write(self):
+        self._writes += 1
+        if self._writes % self.PRUNE_INTERVAL == 0:
+            self._conn().execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+
+    def get(self, key):
+        row = self._conn().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.key_prefix + key, time.time())
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def get_many(self, *keys):
+        if not keys:
+            return []
+        prefixed = [self.key_prefix + key for key in keys]
+        rows = self._conn().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(prefixed))}) "
+            'AND (expires IS NULL OR expires > ?)',
+            (*prefixed, time.time())
+        ).fetchall()
+        found = {key: value for key, value in rows}
+        return [pickle.loads(found[key]) if key in found else None for key in prefixed]
+
+    def set(self, key, value, timeout=None):
+        self._conn().execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (self.key_prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expires(timeout))
+        )
+        self._after_write()
+        return True
+
+    def set_many(self, mapping, timeout=None):
+        expires = self._expires(timeout)
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                [(self.key_prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+                 for key, value in mapping.items()]
+            )
+        self._after_write()
+        return list(mapping.keys())
+
+    def add(self, key, value, timeout=None):
+        # Only replaces a row that has already expired, so add() stays atomic across processes
+        now = time.time()
+        cursor = self._conn().execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (self.key_prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expires(timeout), now)
+        )
+        self._after_write()
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        cursor = self._conn().execute('DELETE FROM cache WHERE key = ?', (self.key_prefix + key,))
+        return cursor.rowcount == 1
+
+    def delete_many(self, *keys):
+        if not keys:
+            return []
+        prefixed = [self.key_prefix + key for key in keys]
+        self._conn().execute(
+            f"DELETE FROM cache WHERE key IN ({','.join('?' * len(prefixed))})", prefixed
+        )
+        return list(keys)
+
+    def has(self, key):
+        row = self._conn().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.key_prefix + key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._conn().execute(
+            "DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (_like_prefix(self.key_prefix),)
+        )
+        return True
+
+    def inc(self, key, delta=1):
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT value, expires FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.key_prefix + key, time.time())
+            ).fetchone()
+            value = (pickle.loads(row[0]) if row else 0) + delta
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+                (self.key_prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                 row[1] if row else self._expires(None))
+            )
+        return value
+
+    def dec(self, key, delta=1):
+        return self.inc(key, -delta)
+
+    def keys(self, prefix='', limit=None):
+        rows = self._conn().execute(
+            "SELECT key FROM cache WHERE key LIKE ? ESCAPE '\\' AND (expires IS NULL OR expires > ?) "
+            'ORDER BY key LIMIT ?',
+            (_like_prefix(self.key_prefix + prefix), time.time(), -1 if limit is None else limit)
+        ).fetchall()
+        return [row[0][len(self.key_prefix):] for row in rows]
+
+def _like_prefix(prefix):
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
+
+def _now():
+    # LocalRedis mirrors redis-py argument names, one of which shadows the time module
+    return time.time()
+
+class LocalRedis:
+    """In-process stand-in for the parts of the redis-py client that RedisCache uses"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, name):
+        entry = self._data.get(name)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= _now():
+            del self._data[name]
+            return None
+        return value
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def get(self, name):
+        with self._lock:
+            return self._live(name)
+
+    def mget(self, names):
+        with self._lock:
+            return [self._live(name) for name in names]
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            self._data[name] = (self._encode(value), _now() + ex if ex else None)
+            return True
+
+    def setex(self, name, time, value):
+        return self.set(name, value, ex=time)
+
+    def setnx(self, name, value):
+        return bool(self.set(name, value, nx=True))
+
+    def expire(self, name, time):
+        with self._lock:
+            value = self._live(name)
+            if value is None:
+                return False
+            self._data[name] = (value, _now() + time)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            deleted = 0
+            for name in names:
+                if self._live(name) is not None:
+                    del self._data[name]
+                    deleted += 1
+            return deleted
+
+    def exists(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._live(name) is not None)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            current = self._live(name)
+            value = int(current or 0) + amount
+            expires = self._data[name][1] if current is not None else None
+            self._data[name] = (self._encode(value), expires)
+            return value
+
+    def keys(self, pattern='*'):
+        with self._lock:
+            return [name.encode() for name in list(self._data)
+                    if self._live(name) is not None and fnmatchcase(name, pattern)]
+
+    def scan_iter(self, match='*', count=None):
+        return iter(self.keys(match))
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+            return True
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+class _LocalPipeline:
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [method(*args, **kwargs) for method, args, kwargs in self._calls]
+        self._calls = []
+        return results
+
+class LocalRedisCache(RedisCache):
+    """RedisCache backed by LocalRedis, for tests and single-process development"""
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs['key_prefix'] = config.get('CACHE_KEY_PREFIX')
+        return cls(LocalRedis(), *args, **kwargs)
+
+def list_keys(backend, prefix='', limit=100):
+    """Keys stored in a cache backend that start with prefix (limit=None for all),
+    or None if the backend cannot list its keys"""
+    if isinstance(backend, SQLiteCache):
+        return backend.keys(prefix, limit)
+
+    if isinstance(backend, RedisCache):
+        key_prefix = backend._get_prefix()
+        keys = []
+        for key in backend._read_client.scan_iter(match=f'{key_prefix}{prefix}*'):
+            key = key.decode() if isinstance(key, bytes) else key
+            keys.append(key[len(key_prefix):])
+            if limit is not None and len(keys) >= limit:
+                break
+        return sorted(keys)
+
+    # SimpleCache keeps its entries in a plain dict
+    entries = getattr(backend, '_cache', None)
+    if isinstance(entries, dict):
+        return sorted(key for key in list(entries) if key.startswith(prefix))[:limit]
+
+    return None
+
+def delete_prefix(backend, prefix):
+    """Delete every key under prefix; returns how many were removed, or None if unsupported"""
+    keys = list_keys(backend, prefix, limit=None)
+    if keys is None:
+        return None
+    if keys:
+        backend.delete_many(*keys)
+    return len(keys)
@@ -0,0 +1,76 @@
+from collections import namedtuple
+import gzip, struct
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Binary layout of a cached response:
+#   version B | status H | expires d | etag length B | header count H | body count B
+#   etag bytes
+#   per header: name length H, name, value length H, value
+#   per body:   encoding length B, encoding, body length I, body
+ENVELOPE_VERSION = 1
+_HEAD = struct.Struct('!BHdBHB')
+_SHORT = struct.Struct('!H')
+_BYTE = struct.Struct('!B')
+_LONG = struct.Struct('!I')
+
+CachedResponse = namedtuple('CachedResponse', ['status', 'expires', 'etag', 'headers', 'bodies'])
+
+def compress_variants(body, min_size=500):
+    """Build the encodings stored alongside the identity body, once at fill time"""
+    bodies = {'identity': body}
+    if len(body) >= min_size:
+        bodies['gzip'] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            bodies['br'] = brotli.compress(body)
+    return bodies
+
+def pack_envelope(status, expires, etag, headers, bodies):
+    """Pack a response into the compact bytes stored in the cache"""
+    etag_bytes = (etag or '').encode('ascii')
+    parts = [_HEAD.pack(ENVELOPE_VERSION, status, expires, len(etag_bytes), len(headers), len(bodies)), etag_bytes]
+
+    for name, value in headers:
+        name_bytes, value_bytes = name.encode('latin-1'), value.encode('latin-1')
+        parts += [_SHORT.pack(len(name_bytes)), name_bytes, _SHORT.pack(len(value_bytes)), value_bytes]
+
+    for encoding, body in bodies.items():
+        encoding_bytes = encoding.encode('ascii')
+        parts += [_BYTE.pack(len(encoding_bytes)), encoding_bytes, _LONG.pack(len(body)), body]
+
+    return b''.join(parts)
+
+def unpack_envelope(data):
+    """Read an envelope back; returns None for anything this version did not write"""
+    if not isinstance(data, bytes) or len(data) < _HEAD.size or data[0] != ENVELOPE_VERSION:
+        return None
+
+    view = memoryview(data)
+    _, status, expires, etag_len, header_count, body_count = _HEAD.unpack_from(view)
+    offset = _HEAD.size
+    etag = bytes(view[offset:offset + etag_len]).decode('ascii') or None
+    offset += etag_len
+
+    headers = []
+    for _ in range(header_count):
+        (length,) = _SHORT.unpack_from(view, offset)
+        name = bytes(view[offset + 2:offset + 2 + length]).decode('latin-1')
+        offset += 2 + length
+        (length,) = _SHORT.unpack_from(view, offset)
+        value = bytes(view[offset + 2:offset + 2 + length]).decode('latin-1')
+        offset += 2 + length
+        headers.append((name, value))
+
+    bodies = {}
+    for _ in range(body_count):
+        length = view[offset]
+        encoding = bytes(view[offset + 1:offset + 1 + length]).decode('ascii')
+        offset += 1 + length
+        (length,) = _LONG.unpack_from(view, offset)
+        bodies[encoding] = bytes(view[offset + 4:offset + 4 + length])
+        offset += 4 + length
+
+    return CachedResponse(status, expires, etag, headers, bodies)
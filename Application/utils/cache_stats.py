@@ -0,0 +1,63 @@
+from collections import defaultdict
+from flask import current_app
+import threading
+
+# Outcomes recorded by cache_response
+OUTCOMES = ('l1_hit', 'l2_hit', 'stale_hit', 'miss', 'not_modified', 'uncached')
+
+def _empty_counters():
+    counters = dict.fromkeys(OUTCOMES, 0)
+    counters.update(fills=0, fill_time_ms=0.0, bytes_served=0, bytes_stored=0)
+    return counters
+
+class CacheStats:
+    """Per-endpoint cache counters for this worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(_empty_counters)
+        self._invalidations = defaultdict(int)
+
+    def record(self, endpoint, outcome, bytes_served=0):
+        with self._lock:
+            counters = self._endpoints[endpoint]
+            counters[outcome] += 1
+            counters['bytes_served'] += bytes_served
+
+    def record_fill(self, endpoint, seconds, bytes_stored):
+        with self._lock:
+            counters = self._endpoints[endpoint]
+            counters['fills'] += 1
+            counters['fill_time_ms'] += seconds * 1000
+            counters['bytes_stored'] += bytes_stored
+
+    def record_invalidation(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._invalidations[tag] += 1
+
+    def snapshot(self):
+        """Counters plus derived hit rate and mean fill time, safe to jsonify"""
+        with self._lock:
+            endpoints = {}
+            for endpoint, counters in self._endpoints.items():
+                counters = dict(counters)
+                hits = counters['l1_hit'] + counters['l2_hit'] + counters['stale_hit'] + counters['not_modified']
+                lookups = hits + counters['miss']
+                counters['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+                counters['fill_time_ms'] = round(counters['fill_time_ms'], 3)
+                counters['avg_fill_ms'] = round(counters['fill_time_ms'] / counters['fills'], 3) if counters['fills'] else 0.0
+                endpoints[endpoint] = counters
+            return {'endpoints': endpoints, 'invalidations': dict(self._invalidations)}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._invalidations.clear()
+
+def cache_stats():
+    """This app's CacheStats, created on first use"""
+    stats = current_app.extensions.get('cache_stats')
+    if stats is None:
+        stats = current_app.extensions.setdefault('cache_stats', CacheStats())
+    return stats
@@ -1,7 +1,25 @@
 from functools import wraps
-from flask import request, make_response, current_app
+from flask import request, make_response, current_app, copy_current_request_context, g
 from Application.extensions import cache
-import json, hashlib
+from Application.utils.cache_envelope import CachedResponse, compress_variants, pack_envelope, unpack_envelope
+from Application.utils.lru_cache import LRUCache
+from Application.utils.cache_stats import cache_stats
+from Application.utils.serializers import wants_stream
+from Application.utils.read_replicas import read_from_primary
+import hashlib, threading, time, uuid
+
+# Tag generations are stored under this prefix
+TAG_KEY_PREFIX = 'tag:'
+
+# Longest timeout and explicit stale window of any cache_response, recorded at decoration
+_longest_entry = {'timeout': 0, 'stale': 0}
+
+# Query parameters that hold an unordered list, e.g. ?fields=name,id is the same as ?fields=id,name
+_SET_ARGS = {'fields', 'expand'}
+
+# Keys this worker is currently filling, for single-flight misses
+_inflight = {}
+_inflight_lock = threading.Lock()
 
 def cache_key_generator(*args, **kwargs):
     """Generate cache key from request args and kwargs"""
@@ -13,57 +31,372 @@ def cache_key_generator(*args, **kwargs):
 
     # Add query parameters
     if request.args:
-        sorted_args = sorted(request.args.items())
+        sorted_args = sorted(
+            (name, ','.join(sorted({v.strip() for v in value.split(',') if v.strip()})) if name in _SET_ARGS else value)
+            for name, value in request.args.items()
+        )
         key_parts.append(hashlib.md5(str(sorted_args).encode()).hexdigest()[:8])
-    
+
     return ":".join(key_parts)
 
-def cache_response(timeout=300):
+def _tag_key(tag):
+    return f'{TAG_KEY_PREFIX}{tag}'
+
+def _new_generation():
+    # Random rather than incrementing, so an evicted tag can never
+    # come back with a generation that matches an old entry; suffixed
+    # with the time it was made, see recently_bumped()
+    return f'{uuid.uuid4().hex[:12]}-{int(time.time())}'
+
+def recently_bumped(generations):
+    """Whether any of these generations is younger than READ_REPLICA_PIN_SECONDS.
+
+    The write behind such a bump may not have reached the replicas yet, so a
+    value cached under it has to be read from the primary.
+    """
+    window = current_app.config.get('READ_REPLICA_PIN_SECONDS', 0) if current_app.config.get('READ_REPLICAS') else 0
+    if not window:
+        return False
+    now = time.time()
+    for generation in generations:
+        made = generation.rpartition('-')[2]
+        # Whole seconds, so allow one more; generations without a time predate it and are old
+        if made.isdigit() and now - int(made) < window + 1:
+            return True
+    return False
+
+def tag_timeout(lifetime=0):
+    """How long a tag generation is kept: past the longest-lived entry keyed on it.
+
+    Generations are random, so a tag that expires and is recreated only makes
+    older entries unreachable; it can never revive one. The TTL just stops
+    probes of ids that are never written from piling up. CACHE_TAG_TIMEOUT
+    raises the floor; `lifetime` covers entries not made by cache_response.
+    """
+    stale = max(_longest_entry['stale'], current_app.config.get('CACHE_STALE_WHILE_REVALIDATE', 0))
+    return max(current_app.config.get('CACHE_TAG_TIMEOUT', 0), _longest_entry['timeout'] + stale, lifetime) + 1
+
+def resolve_tags(tags, principal=None):
+    """Fill tag templates such as 'customer:{customer_id}' from the URL parameters.
+
+    '{principal}' is the authenticated customer set by token_required.
+    """
+    view_args = request.view_args or {}
+    return [tag.format(principal=principal, **view_args) for tag in tags]
+
+def tag_l1():
+    """This worker's short-lived copy of tag generations"""
+    l1 = current_app.extensions.get('cache_tags_l1')
+    if l1 is None:
+        l1 = current_app.extensions.setdefault('cache_tags_l1', LRUCache(
+            maxsize=current_app.config.get('CACHE_TAG_L1_SIZE', 4096),
+            timeout=current_app.config.get('CACHE_TAG_L1_TIMEOUT', 0)
+        ))
+    return l1
+
+def get_tag_generations(tags, lifetime=0, local_ttl=0, create=True):
+    """Return the current generation of each tag, creating any that are missing.
+
+    With create=False a missing tag is left as None instead; see claim_tag_generation().
+
+    `lifetime` is how long the caller's entries live, if longer than cache_response's.
+    With local_ttl > 0 generations are also kept in this worker's tag_l1() for that
+    many seconds, so a hot key needs no backend round trip at all; an invalidation
+    from another worker may then take up to local_ttl seconds to be seen here.
+    """
+    if not tags:
+        return []
+
+    keys = [_tag_key(tag) for tag in tags]
+    l1 = tag_l1() if local_ttl > 0 else None
+    generations = [l1.get(key) for key in keys] if l1 else [None] * len(keys)
+
+    missing = [i for i, generation in enumerate(generations) if generation is None]
+    if missing:
+        for i, generation in zip(missing, cache.get_many(*(keys[i] for i in missing))):
+            if generation is None:
+                if not create:
+                    continue
+                generation = _new_generation()
+                # add() only succeeds for the first writer, so concurrent requests agree
+                if not cache.add(keys[i], generation, timeout=tag_timeout(lifetime)):
+                    generation = cache.get(keys[i]) or generation
+            generations[i] = generation
+            if l1:
+                l1.set(keys[i], generation, timeout=local_ttl)
+
+    return generations
+
+def claim_tag_generation(tag, lifetime=0):
+    """Create a generation for a tag that has none; None if one already exists.
+
+    For callers that only learn a resource exists after reading it: an
+    invalidation that lands in between writes the tag first, so the claim
+    fails and the value read before it is not cached.
+    """
+    generation = _new_generation()
+    if cache.add(_tag_key(tag), generation, timeout=tag_timeout(lifetime)):
+        return generation
+    return None
+
+# Headers recomputed for every response, never stored in the envelope
+_UNCACHED_HEADERS = {'content-length', 'content-encoding', 'etag', 'cache-control', 'vary', 'set-cookie'}
+
+def _client_max_age(max_age, expires):
+    """Client freshness, never longer than what is left of the server-side TTL"""
+    if max_age is None:
+        max_age = current_app.config.get('CACHE_CLIENT_MAX_AGE', 0)
+    return max(0, min(max_age, int(expires - time.time())))
+
+def _add_validators(resp, etag, max_age, private=False):
+    """Attach the ETag and a Cache-Control header that tells clients to revalidate"""
+    resp.set_etag(etag)
+    scope = 'private' if private else 'public'
+    resp.headers['Cache-Control'] = f'{scope}, max-age={max_age}, must-revalidate'
+    return resp
+
+def _not_modified(etag, max_age, private=False):
+    return _add_validators(current_app.response_class(status=304), etag, max_age, private)
+
+def _pick_encoding(bodies):
+    """Best stored encoding the client accepts"""
+    for encoding in ('br', 'gzip'):
+        if encoding in bodies and request.accept_encodings[encoding]:
+            return encoding
+    return 'identity'
+
+def _build_entry(rv, timeout):
+    """Render the view's return value into the final bytes, compressed variants included"""
+    resp = make_response(rv)
+    body = resp.get_data()
+
+    # Only successful responses get a validator
+    etag = hashlib.sha256(body).hexdigest() if resp.status_code == 200 else None
+    headers = [(k, v) for k, v in resp.headers.items() if k.lower() not in _UNCACHED_HEADERS]
+    bodies = compress_variants(body, current_app.config.get('CACHE_COMPRESS_MIN_SIZE', 500))
+
+    return CachedResponse(resp.status_code, time.time() + timeout, etag, headers, bodies)
+
+def _serve(entry, max_age, private=False):
+    """Answer from a cached entry: a 304, or the stored bytes in the best encoding"""
+    encoding = _pick_encoding(entry.bodies)
+    # Each encoding is a different representation, so it gets its own strong ETag
+    etag = entry.etag
+    if etag and encoding != 'identity':
+        etag = f'{etag}-{encoding}'
+
+    if etag:
+        client_max_age = _client_max_age(max_age, entry.expires)
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag, client_max_age, private)
+
+    resp = current_app.response_class(entry.bodies[encoding], status=entry.status, headers=entry.headers)
+    if len(entry.bodies) > 1:
+        resp.headers['Vary'] = 'Accept-Encoding'
+    if encoding != 'identity':
+        resp.headers['Content-Encoding'] = encoding
+    if etag:
+        _add_validators(resp, etag, client_max_age, private)
+    return resp
+
+def response_l1():
+    """This worker's in-process tier in front of the shared cache"""
+    l1 = current_app.extensions.get('cache_l1')
+    if l1 is None:
+        l1 = current_app.extensions.setdefault('cache_l1', LRUCache(
+            maxsize=current_app.config.get('CACHE_L1_SIZE', 1024),
+            timeout=current_app.config.get('CACHE_L1_TIMEOUT', 60)
+        ))
+    return l1
+
+def _remember(l1, cache_key, entry):
+    # Never keep an entry in L1 past its own freshness
+    l1.set(cache_key, entry, timeout=min(l1.timeout, entry.expires - time.time()))
+
+def _lock_timeout():
+    return current_app.config.get('CACHE_LOCK_TIMEOUT', 10)
+
+def _fill_once(cache_key, fill):
+    """Single-flight fill: one caller per key computes the entry, the rest wait for it.
+
+    Threads of this worker wait on an Event; other workers are kept out by an
+    add()-based lock in the shared cache and poll for the leader's result.
+    Waiters that time out compute the entry themselves rather than fail.
+    """
+    with _inflight_lock:
+        event = _inflight.get(cache_key)
+        leader = event is None
+        if leader:
+            event = _inflight[cache_key] = threading.Event()
+
+    if not leader:
+        event.wait(_lock_timeout())
+        return unpack_envelope(cache.get(cache_key)) or fill()
+
+    try:
+        lock_key = f'lock:{cache_key}'
+        if cache.add(lock_key, 1, timeout=_lock_timeout()):
+            try:
+                return fill()
+            finally:
+                cache.delete(lock_key)
+
+        # Another worker holds the lock, wait for the entry it is building; once the
+        # lock is gone without one (an error response, or a failed fill) stop waiting
+        deadline = time.time() + _lock_timeout()
+        while time.time() < deadline:
+            time.sleep(0.05)
+            packed, locked = cache.get_many(cache_key, lock_key)
+            entry = unpack_envelope(packed)
+            if entry is not None:
+                return entry
+            if not locked:
+                break
+        return fill()
+    finally:
+        with _inflight_lock:
+            _inflight.pop(cache_key, None)
+        event.set()
+
+def _refresh_in_background(cache_key, fill):
+    """Rebuild a stale entry off the request thread, at most once per key at a time"""
+    lock_key = f'lock:{cache_key}'
+    if not cache.add(lock_key, 1, timeout=_lock_timeout()):
+        return
+
+    @copy_current_request_context
+    def refresh():
+        try:
+            fill()
+        except Exception:
+            current_app.logger.exception('Background refresh of %s failed', cache_key)
+        finally:
+            cache.delete(lock_key)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+def cache_response(timeout=300, tags=(), max_age=None, stale=None, per_principal=False, streams=False):
+    """Cache GET responses, keyed by request and by the generation of each resource tag.
+
+    Tags may reference URL parameters, e.g. tags=('customers', 'customer:{customer_id}'),
+    or be a callable returning the tags for the current request.
+    Bumping any of them with invalidate_cache_pattern() makes the entry unreachable.
+    Entries hold the final response bytes (plus gzip/brotli variants) in a binary
+    envelope, so a hit does no JSON or compression work. Successful responses carry
+    a strong ETag for If-None-Match revalidation; max_age (default
+    CACHE_CLIENT_MAX_AGE) is how long clients may skip it, capped by the remaining TTL.
+
+    A bounded in-process LRU (CACHE_L1_SIZE entries, CACHE_L1_TIMEOUT seconds)
+    sits in front of the shared backend; both tiers share the tagged key. Tag
+    generations are kept in-process too, for CACHE_TAG_L1_TIMEOUT seconds capped
+    by the stale window, so an L1 hit makes no backend call. An invalidation is
+    seen at once by the worker that made it and within that time by the others.
+
+    per_principal=True scopes entries to the customer authenticated by
+    token_required (place it below @token_required); such responses are marked
+    private and tags may use '{principal}', e.g. 'customer_tickets:{principal}'.
+
+    Only 2xx responses are stored; errors are rebuilt on every request.
+
+    A fill under a tag bumped within READ_REPLICA_PIN_SECONDS reads from the
+    primary, so a lagging replica cannot store old data under the new generation.
+
+    Misses are single-flight per key. For `stale` seconds past the TTL (default
+    CACHE_STALE_WHILE_REVALIDATE) the expired body is still served while one
+    background refresh rebuilds it.
+
+    streams=True marks an endpoint that answers ?stream=1 / Accept:
+    application/x-ndjson with a streamed body; those requests bypass the cache,
+    since the body is produced while it is sent and is never held in full.
+    """
+    _longest_entry['timeout'] = max(_longest_entry['timeout'], timeout)
+    _longest_entry['stale'] = max(_longest_entry['stale'], stale or 0)
+
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             if request.method != 'GET':
                 return f(*args, **kwargs)
+            if streams and wants_stream():
+                cache_stats().record(request.endpoint, 'uncached')
+                return f(*args, **kwargs)
 
             cache_key = cache_key_generator(*args, **kwargs)
-            cached = cache.get(cache_key)
-            if cached:
-                # cached is a JSON string that contains body and status
-                payload = json.loads(cached)
-                body = payload.get('body', '')
-                status = payload.get('status', 200)
-                content_type = payload.get('content_type', 'application/json')
-                resp = make_response(body, status)
-                resp.headers['Content-Type'] = content_type
-                return resp
-
-            # Call the view function
-            rv = f(*args, **kwargs)
-
-            # Normalize to (body_text, status, content_type)
-            if isinstance(rv, tuple):
-                # (response, status) or (response, status, headers)
-                response_obj = rv[0]
-                status = rv[1] if len(rv) > 1 else 200
+            principal = None
+            if per_principal:
+                principal = g.get('customer_id')
+                if principal is None:
+                    # Never share an authenticated response without knowing whose it is
+                    cache_stats().record(request.endpoint, 'uncached')
+                    return f(*args, **kwargs)
+                cache_key = f'{cache_key}:principal={principal}'
+
+            stale_window = stale if stale is not None else current_app.config.get('CACHE_STALE_WHILE_REVALIDATE', 0)
+
+            # Generations cached in-process for at most the stale window, a lag this entry already tolerates
+            local_ttl = min(current_app.config.get('CACHE_TAG_L1_TIMEOUT', 0), stale_window)
+            generations = get_tag_generations(resolve_tags(tags() if callable(tags) else tags, principal),
+                                              local_ttl=local_ttl)
+            if generations:
+                cache_key = f"{cache_key}@{'.'.join(generations)}"
+
+            l1 = response_l1()
+            stats = cache_stats()
+            endpoint = request.endpoint
+
+            def fill():
+                # Call the view function and store its rendered bytes in both tiers
+                started = time.perf_counter()
+                if recently_bumped(generations):
+                    read_from_primary()
+                entry = _build_entry(f(*args, **kwargs), timeout)
+                if not 200 <= entry.status < 300:
+                    # Errors are served but never stored, e.g. a 404 for an id about to be created
+                    return entry
+                packed = pack_envelope(*entry)
+                cache.set(cache_key, packed, timeout=timeout + stale_window)
+                _remember(l1, cache_key, entry)
+                stats.record_fill(endpoint, time.perf_counter() - started, len(packed))
+                return entry
+
+            entry = l1.get(cache_key)
+            if entry is not None:
+                outcome = 'l1_hit'
             else:
-                response_obj = rv
-                status = 200
-
-            # response_obj is a Flask Response (jsonify returns one)
-            body_text = response_obj.get_data(as_text=True)
-            content_type = response_obj.headers.get('Content-Type', 'application/json')
-
-            # store a safe JSON string with the body and status
-            cache_payload = json.dumps({
-                'body': body_text,
-                'status': status,
-                'content_type': content_type
-            })
-            cache.set(cache_key, cache_payload, timeout=timeout)
-
-            return rv
+                entry = unpack_envelope(cache.get(cache_key))
+                if entry is None:
+                    outcome = 'miss'
+                    entry = _fill_once(cache_key, fill)
+                elif entry.expires <= time.time():
+                    # Past the TTL but inside the stale window
+                    outcome = 'stale_hit'
+                    _refresh_in_background(cache_key, fill)
+                else:
+                    outcome = 'l2_hit'
+                    _remember(l1, cache_key, entry)
+
+            resp = _serve(entry, max_age, per_principal)
+            if resp.status_code == 304 and outcome != 'miss':
+                outcome = 'not_modified'
+            stats.record(endpoint, outcome, resp.calculate_content_length() or 0)
+            return resp
         return decorated_function
     return decorator
 
-def invalidate_cache_pattern(pattern):
-    pass
\ No newline at end of file
+def invalidate_cache_pattern(*tags, lifetime=0):
+    """Invalidate every cached response carrying any of the given tags.
+
+    Each tag gets a fresh generation in a single write, so all dependent
+    keys go stale at once and simply age out of the backend.
+    """
+    if not tags:
+        return
+    generations = {_tag_key(tag): _new_generation() for tag in tags}
+    cache.set_many(generations, timeout=tag_timeout(lifetime))
+
+    # This worker sees its own writes immediately
+    l1 = tag_l1()
+    for key, generation in generations.items():
+        l1.delete(key)
+        l1.set(key, generation)
+    cache_stats().record_invalidation(tags)
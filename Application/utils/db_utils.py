@@ -0,0 +1,202 @@
+from flask import jsonify
+from sqlalchemy import delete, insert, literal, select, tuple_, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from Application.models import db
+import re
+
+# Dialects with a native single-statement upsert
+_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+    'mysql': mysql.insert,
+    'mariadb': mysql.insert
+}
+
+# MySQL/MariaDB error code for a duplicate key
+_MYSQL_DUPLICATE_KEY = 1062
+
+def _dialect_insert(model, values):
+    """Dialect name and a dialect-specific insert(), or a generic one for other dialects"""
+    dialect = db.session.get_bind().dialect.name
+    return dialect, _INSERTS.get(dialect, insert)(model).values(**values)
+
+def _key_criteria(model, values, conflict_columns):
+    return [model.__table__.c[column] == values[column] for column in conflict_columns]
+
+def _row_exists(model, values, conflict_columns):
+    query = select(literal(1)).select_from(model).where(*_key_criteria(model, values, conflict_columns))
+    return db.session.execute(query.limit(1)).first() is not None
+
+def _is_duplicate_key(error):
+    orig = getattr(error, 'orig', None)
+    code = getattr(orig, 'errno', None) or (orig.args[0] if orig is not None and orig.args else None)
+    return code == _MYSQL_DUPLICATE_KEY
+
+def upsert(model, values, conflict_columns, increment=()):
+    """Insert a row, or add its `increment` columns onto the existing row.
+
+    ON CONFLICT DO UPDATE on SQLite/PostgreSQL, ON DUPLICATE KEY UPDATE on MySQL,
+    and an UPDATE-then-INSERT (retried once on a conflict) on any other dialect.
+    `conflict_columns` must be the primary key or a unique constraint.
+    Runs in the caller's transaction. With no `increment` this is insert_ignore().
+    """
+    if not increment:
+        return insert_ignore(model, values, conflict_columns)
+
+    dialect, stmt = _dialect_insert(model, values)
+    table = model.__table__
+
+    if dialect in ('mysql', 'mariadb'):
+        stmt = stmt.on_duplicate_key_update({
+            column: table.c[column] + stmt.inserted[column] for column in increment
+        })
+    elif dialect in _INSERTS:
+        stmt = stmt.on_conflict_do_update(index_elements=conflict_columns, set_={
+            column: table.c[column] + stmt.excluded[column] for column in increment
+        })
+    else:
+        _portable_upsert(model, values, conflict_columns, increment)
+        return
+
+    db.session.execute(stmt)
+
+def _portable_upsert(model, values, conflict_columns, increment):
+    table = model.__table__
+    add = update(model).where(*_key_criteria(model, values, conflict_columns)).values({
+        column: table.c[column] + values[column] for column in increment
+    }).execution_options(synchronize_session=False)
+
+    if db.session.execute(add).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(model).values(**values))
+    except IntegrityError:
+        # Another transaction inserted the row first; add onto it instead
+        if not _row_exists(model, values, conflict_columns):
+            raise
+        db.session.execute(add)
+
+def insert_ignore(model, values, conflict_columns):
+    """Insert a row unless it already exists; returns True if a row was inserted.
+
+    Only a duplicate key is skipped: foreign key, NOT NULL and other
+    violations still raise.
+    """
+    dialect, stmt = _dialect_insert(model, values)
+
+    if dialect in ('mysql', 'mariadb'):
+        # Not INSERT IGNORE, which also swallows FK and NOT NULL errors, and not
+        # ON DUPLICATE KEY UPDATE, whose affected-row count under the FOUND_ROWS
+        # flag SQLAlchemy sets is 1 for an insert and for a duplicate alike
+        try:
+            with db.session.begin_nested():
+                db.session.execute(stmt)
+            return True
+        except IntegrityError as e:
+            if not _is_duplicate_key(e):
+                raise
+            return False
+
+    if dialect in _INSERTS:
+        stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+        return db.session.execute(stmt).rowcount == 1
+
+    return _portable_insert_ignore(model, values, conflict_columns)
+
+def _portable_insert_ignore(model, values, conflict_columns):
+    # Check first, and treat losing an insert race as "already there"
+    if _row_exists(model, values, conflict_columns):
+        return False
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(model).values(**values))
+        return True
+    except IntegrityError:
+        if not _row_exists(model, values, conflict_columns):
+            raise
+        return False
+
+def insert_ignore_many(model, rows, conflict_columns, returning):
+    """Insert the rows that do not exist yet; returns `returning` of each row inserted.
+
+    A fixed number of statements however many rows there are: one multi-row
+    INSERT ... ON CONFLICT DO NOTHING RETURNING on SQLite/PostgreSQL, and on
+    MySQL a locked read of the rows already there followed by one executemany.
+    Other dialects fall back to insert_ignore() per row. Runs in the caller's transaction.
+    """
+    if not rows:
+        return []
+    dialect = db.session.get_bind().dialect.name
+    table = model.__table__
+
+    if dialect in ('sqlite', 'postgresql'):
+        stmt = (_INSERTS[dialect](model).values(rows)
+                .on_conflict_do_nothing(index_elements=conflict_columns).returning(returning))
+        return db.session.execute(stmt).scalars().all()
+
+    if dialect in ('mysql', 'mariadb'):
+        # FOR UPDATE also locks the gaps of missing keys, so no other transaction can insert them meanwhile
+        key = tuple_(*(table.c[column] for column in conflict_columns))
+        existing = set(db.session.execute(
+            select(*(table.c[column] for column in conflict_columns))
+            .where(key.in_([tuple(row[column] for column in conflict_columns) for row in rows]))
+            .with_for_update()
+        ).tuples())
+        new_rows = [row for row in rows if tuple(row[column] for column in conflict_columns) not in existing]
+        if new_rows:
+            db.session.execute(insert(model), new_rows)
+        return [row[returning.key] for row in new_rows]
+
+    return [row[returning.key] for row in rows if insert_ignore(model, row, conflict_columns)]
+
+def delete_returning(model, column, *criteria):
+    """Delete the rows matching `criteria`; returns `column` of each row this statement removed.
+
+    DELETE ... RETURNING where the dialect has it (SQLite, PostgreSQL, MariaDB);
+    elsewhere the rows are locked with SELECT ... FOR UPDATE before the delete,
+    so a concurrent transaction cannot remove, and count, the same rows.
+    Runs in the caller's transaction.
+    """
+    if db.session.get_bind().dialect.delete_returning:
+        stmt = delete(model).where(*criteria).returning(column).execution_options(synchronize_session=False)
+        return db.session.execute(stmt).scalars().all()
+
+    values = db.session.execute(select(column).where(*criteria).with_for_update()).scalars().all()
+    if values:
+        db.session.execute(delete(model).where(*criteria).execution_options(synchronize_session=False))
+    return values
+
+# Where each driver names the column behind a unique violation
+_UNIQUE_VIOLATION_PATTERNS = (
+    re.compile(r"unique constraint failed: \w+\.(\w+)", re.IGNORECASE),  # SQLite
+    re.compile(r"key \((\w+)\)=\(", re.IGNORECASE),                       # PostgreSQL (DETAIL line)
+    re.compile(r"duplicate entry .* for key '(?:\w+\.)?(\w+)'", re.IGNORECASE)  # MySQL
+)
+
+def violated_unique_column(error):
+    """Column named by a unique-constraint IntegrityError, or None if it cannot be told"""
+    message = str(getattr(error, 'orig', error))
+    for pattern in _UNIQUE_VIOLATION_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return match.group(1)
+    return None
+
+def commit_or_conflict(messages):
+    """Commit the session, turning a unique violation into a 400 response.
+
+    `messages` maps unique columns to their error text, e.g.
+    {'email': "Email already associated with an account"}. Returns None on
+    success; violations of any other constraint are re-raised.
+    """
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        column = violated_unique_column(e)
+        if column not in messages:
+            raise
+        return jsonify({"error": messages[column]}), 400
+    return None
@@ -0,0 +1,140 @@
+from flask import current_app, request, url_for
+from sqlalchemy import and_, or_
+from datetime import date, datetime
+from decimal import Decimal
+from Application.models import db
+import base64, json
+
+class PaginationError(ValueError):
+    """Bad paging parameters; the message is safe to return to the client"""
+
+class InvalidCursor(PaginationError):
+    """Raised when an ?after= cursor cannot be decoded"""
+    def __init__(self, cursor=None):
+        super().__init__("Invalid cursor")
+
+class InvalidSort(PaginationError):
+    """Raised for a ?sort= field that is not sortable"""
+    def __init__(self, field, allowed):
+        super().__init__(f"Cannot sort by '{field}'. Sortable fields: {', '.join(allowed)}")
+
+def encode_cursor(values):
+    """Opaque, URL-safe cursor for the last row of a page"""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or not values:
+        raise InvalidCursor(cursor)
+    return values
+
+def page_limit(requested):
+    """Clamp a requested page size to the server-enforced bounds"""
+    default = current_app.config.get('PAGINATION_DEFAULT_LIMIT', 20)
+    maximum = current_app.config.get('PAGINATION_MAX_LIMIT', 100)
+    if requested is None or requested < 1:
+        return default
+    return min(requested, maximum)
+
+def parse_sort(sort, sortable):
+    """Turn ?sort=name / ?sort=-price into (column or None, descending).
+
+    `sortable` maps public field names to columns; 'id' sorts by primary key only.
+    """
+    if not sort:
+        return None, False
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field == 'id':
+        return None, descending
+    if field not in sortable:
+        raise InvalidSort(field, ['id', *sortable])
+    return sortable[field], descending
+
+def _to_cursor_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+def _from_cursor_value(column, value, cursor):
+    """Cursor value as the column's Python type; anything else means a forged or corrupted cursor"""
+    python_type = column.type.python_type
+    if python_type in (date, datetime):
+        # Date columns only accept date objects as bind parameters
+        if not isinstance(value, str):
+            raise InvalidCursor(cursor)
+        try:
+            return python_type.fromisoformat(value)
+        except ValueError:
+            raise InvalidCursor(cursor)
+    if python_type in (int, float, Decimal):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise InvalidCursor(cursor)
+        return value
+    if not isinstance(value, python_type):
+        raise InvalidCursor(cursor)
+    return value
+
+def _row_value(row, column):
+    # Works for entity rows (select(Model)) and column rows (select(Model.id, ...))
+    mapping = row._mapping
+    if column in mapping:
+        return mapping[column]
+    return getattr(row[0], column.key)
+
+def sort_order(id_column, sort_column=None, descending=False):
+    """ORDER BY clauses for (sort_column, id), the order keyset pages are read in"""
+    order = [id_column.desc() if descending else id_column]
+    if sort_column is not None:
+        order.insert(0, sort_column.desc() if descending else sort_column)
+    return order
+
+def keyset_page(query, id_column, limit, after=None, sort_column=None, descending=False):
+    """Fetch one page of `query` in (sort_column, id) order, starting after a cursor.
+
+    Reads limit + 1 rows so has_next needs no COUNT(*); returns
+    (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    sort_name = sort_column.key if sort_column is not None else 'id'
+
+    if after is not None:
+        values = decode_cursor(after)
+        # Cursors are [sort field, (sort value,) last id] and only valid for the same sort
+        expected = 2 if sort_column is None else 3
+        if len(values) != expected or values[0] != sort_name or not isinstance(values[-1], int) or isinstance(values[-1], bool):
+            raise InvalidCursor(after)
+
+        last_id = values[-1]
+        if sort_column is None:
+            query = query.where(id_column < last_id if descending else id_column > last_id)
+        else:
+            last_value = _from_cursor_value(sort_column, values[1], after)
+            if descending:
+                query = query.where(or_(sort_column < last_value, and_(sort_column == last_value, id_column < last_id)))
+            else:
+                query = query.where(or_(sort_column > last_value, and_(sort_column == last_value, id_column > last_id)))
+
+    rows = db.session.execute(query.order_by(*sort_order(id_column, sort_column, descending)).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = [sort_name, _row_value(last, id_column)]
+        if sort_column is not None:
+            values.insert(1, _to_cursor_value(_row_value(last, sort_column)))
+        next_cursor = encode_cursor(values)
+
+    return rows, next_cursor
+
+def with_next_page(response, next_cursor, limit):
+    """Advertise the next page of a bare-list response in X-Next-Cursor and a Link header"""
+    if next_cursor is not None:
+        args = request.args.to_dict()
+        args.update(after=next_cursor, limit=limit)
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response
@@ -0,0 +1,86 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+import atexit, multiprocessing, os, threading
+
+# Werkzeug's own default, used outside an app context
+DEFAULT_HASH_METHOD = 'scrypt'
+
+class HashingBusy(Exception):
+    """Every hashing slot is taken; the client should retry shortly"""
+
+# One pool per process and setting; a forked worker must not reuse its parent's pool
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _config(name, default):
+    return current_app.config.get(name, default) if has_app_context() else default
+
+def _context():
+    # Never fork this (threaded) process: forkserver forks from a clean single-threaded server
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def _pool():
+    """(executor, slots) for this process, or None when hashing runs inline"""
+    workers = _config('PASSWORD_HASH_WORKERS', 0)
+    if not workers:
+        return None
+
+    queue = _config('PASSWORD_HASH_QUEUE', workers * 2)
+    key = (os.getpid(), workers, queue)
+    with _pools_lock:
+        if key not in _pools:
+            # Settings changed: retire this process's old pool once its hashes finish
+            for old in [k for k in _pools if k[0] == key[0]]:
+                _pools.pop(old)[0].shutdown(wait=False)
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=_context())
+            # Hashes running plus hashes allowed to queue behind them
+            slots = threading.BoundedSemaphore(workers + queue)
+            _pools[key] = (executor, slots)
+        return _pools[key]
+
+@atexit.register
+def _shutdown_pools():
+    with _pools_lock:
+        for key in [k for k in _pools if k[0] == os.getpid()]:
+            _pools.pop(key)[0].shutdown(wait=False, cancel_futures=True)
+
+def init_app(app):
+    """Create the hashing pool while the app is set up, not from a request thread"""
+    with app.app_context():
+        _pool()
+
+def _run(fn, *args):
+    """Run a hashing call on the pool, or raise HashingBusy if no slot frees up in time"""
+    pool = _pool()
+    if pool is None:
+        return fn(*args)
+
+    executor, slots = pool
+    if not slots.acquire(timeout=_config('PASSWORD_HASH_WAIT', 0.5)):
+        raise HashingBusy()
+    try:
+        return executor.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+def hash_method():
+    return _config('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+
+def hash_password(password):
+    """Hash with the configured PASSWORD_HASH_METHOD, off the request thread when a pool is configured"""
+    return _run(generate_password_hash, password, hash_method())
+
+def verify_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+@lru_cache(maxsize=16)
+def _full_method(method):
+    # Werkzeug fills in default costs ('scrypt' -> 'scrypt:32768:8:1'), so ask it once
+    return generate_password_hash('', method).split('$', 1)[0]
+
+def needs_rehash(pwhash):
+    """Whether a stored hash was made with a different method or cost than configured"""
+    return pwhash.split('$', 1)[0] != _full_method(hash_method())
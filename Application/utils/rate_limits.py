@@ -0,0 +1,149 @@
+from flask import current_app, request
+from limits.storage import Storage, MovingWindowSupport
+from Application.utils.sqlite_files import thread_connection
+import os, sqlite3, threading, time
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """Rate-limit counters in one SQLite file, shared by every worker process on the host.
+
+    Registered for sqlite:// URIs (three slashes for a relative path, four for an
+    absolute one); see init_storage() for the default file. Supports the
+    fixed-window and moving-window strategies.
+
+    Every hit is a short write, and SQLite takes one writer at a time, so all
+    workers queue on the file's write lock; fine for a single host, not a
+    substitute for Redis under heavy traffic.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+    # Finished windows of keys that are never hit again are swept every this many writes
+    PRUNE_INTERVAL = 500
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        path = (uri or 'sqlite:///ratelimit.sqlite3').split('://', 1)[1][1:] or 'ratelimit.sqlite3'
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        conn = self._conn()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS counters ('
+            'key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires REAL NOT NULL)'
+        )
+        conn.execute('CREATE TABLE IF NOT EXISTS events (key TEXT NOT NULL, at REAL NOT NULL, expires REAL NOT NULL)')
+        if 'expires' not in {column[1] for column in conn.execute('PRAGMA table_info(events)')}:
+            # Files made before events carried their expiry; those rows are simply swept on the next prune
+            conn.execute('ALTER TABLE events ADD COLUMN expires REAL NOT NULL DEFAULT 0')
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_events_key_at ON events (key, at)')
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    def _conn(self):
+        return thread_connection(self._local, self.path)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _after_write(self):
+        self._writes += 1
+        if self._writes % self.PRUNE_INTERVAL == 0:
+            now = time.time()
+            conn = self._conn()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('DELETE FROM counters WHERE expires <= ?', (now,))
+                conn.execute('DELETE FROM events WHERE expires <= ?', (now,))
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        # One statement, so the write lock is held only for the upsert; a finished window starts again from zero
+        (value,) = self._conn().execute(
+            'INSERT INTO counters (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET '
+            'value = CASE WHEN expires <= ? THEN excluded.value ELSE value + excluded.value END, '
+            'expires = CASE WHEN expires <= ? THEN excluded.expires ELSE expires END '
+            'RETURNING value',
+            (key, amount, now + expiry, now, now)
+        ).fetchone()
+        self._after_write()
+        return value
+
+    def get(self, key):
+        row = self._conn().execute(
+            'SELECT value FROM counters WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._conn().execute(
+            'SELECT expires FROM counters WHERE key = ? AND expires > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._conn().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            removed = conn.execute('DELETE FROM counters').rowcount
+            removed += conn.execute('DELETE FROM events').rowcount
+        return removed
+
+    def clear(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM counters WHERE key = ?', (key,))
+            conn.execute('DELETE FROM events WHERE key = ?', (key,))
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM events WHERE key = ? AND at < ?', (key, now - expiry))
+            (count,) = conn.execute('SELECT COUNT(*) FROM events WHERE key = ?', (key,)).fetchone()
+            if count + amount > limit:
+                return False
+            conn.executemany('INSERT INTO events (key, at, expires) VALUES (?, ?, ?)', [(key, now, now + expiry)] * amount)
+        self._after_write()
+        return True
+
+    def get_moving_window(self, key, limit, expiry):
+        now = time.time()
+        oldest, count = self._conn().execute(
+            'SELECT MIN(at), COUNT(*) FROM events WHERE key = ? AND at >= ?', (key, now - expiry)
+        ).fetchone()
+        return (oldest, count) if count else (now, 0)
+
+def init_storage(app):
+    """Without a RATELIMIT_STORAGE_URI, keep counters in a SQLite file next to the cache.
+
+    The file is RATELIMIT_SQLITE_PATH, or ratelimit.sqlite3 in the instance folder;
+    call before limiter.init_app(app).
+    """
+    if app.config.get('RATELIMIT_STORAGE_URI'):
+        return
+    path = app.config.get('RATELIMIT_SQLITE_PATH') or os.path.join(app.instance_path, 'ratelimit.sqlite3')
+    app.config['RATELIMIT_STORAGE_URI'] = 'sqlite:///' + os.path.abspath(path)
+
+def configured_limit(default):
+    """Limit string for @limiter.limit that can be overridden per endpoint in config.
+
+    RATELIMIT_ROUTES maps endpoint names to limit strings, e.g.
+    {'customers.login': '20 per minute'}; endpoints not listed keep `default`.
+    """
+    def limit():
+        return current_app.config.get('RATELIMIT_ROUTES', {}).get(request.endpoint, default)
+    return limit
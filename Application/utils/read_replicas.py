@@ -0,0 +1,132 @@
+from flask import current_app, has_request_context, request, g
+from flask_sqlalchemy.session import Session
+from sqlalchemy import UpdateBase, text
+from Application.extensions import cache
+import itertools, threading, time
+
+# Requests with these methods never write, so their queries may go to a replica
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Clients that wrote recently are pinned to the primary under this prefix
+PIN_KEY_PREFIX = 'rw_pin:'
+
+class ReplicaHealth:
+    """Per-worker view of which replicas answer, probed with SELECT 1.
+
+    A healthy replica is re-probed every READ_REPLICA_HEALTH_INTERVAL seconds,
+    a failed one is retried after READ_REPLICA_RETRY_AFTER seconds. One thread
+    probes a replica at a time; requests arriving meanwhile use the primary
+    rather than queue behind a connect that may hang until its timeout.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+        self._probing = set()
+        self._turn = itertools.count()
+
+    def is_healthy(self, key, engine):
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked_at = self._state.get(key, (None, 0.0))
+            wait = current_app.config.get('READ_REPLICA_HEALTH_INTERVAL' if healthy else 'READ_REPLICA_RETRY_AFTER',
+                                          30 if healthy else 5)
+            if healthy is not None and now - checked_at < wait:
+                return healthy
+            if key in self._probing:
+                return False
+            self._probing.add(key)
+
+        healthy = False
+        try:
+            healthy = self._probe(key, engine)
+        finally:
+            with self._lock:
+                self._probing.discard(key)
+                self._state[key] = (healthy, time.monotonic())
+        return healthy
+
+    def _probe(self, key, engine):
+        try:
+            with engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+            return True
+        except Exception:
+            current_app.logger.warning('Read replica %s failed its health check, using the primary', key)
+            return False
+
+    def next_turn(self):
+        return next(self._turn)
+
+def replica_health():
+    """This app's ReplicaHealth, created on first use"""
+    health = current_app.extensions.get('replica_health')
+    if health is None:
+        health = current_app.extensions.setdefault('replica_health', ReplicaHealth())
+    return health
+
+def _pin_keys():
+    # The client's own address (the first X-Forwarded-For hop behind a proxy), plus its principal once known
+    address = (request.access_route or [request.remote_addr])[0]
+    keys = [f'{PIN_KEY_PREFIX}{address}']
+    if g.get('customer_id') is not None:
+        keys.append(f"{PIN_KEY_PREFIX}customer:{g.customer_id}")
+    return keys
+
+def _choose_replica(engines):
+    """Healthy replica engine for this read request, or None for the primary"""
+    replicas = [key for key in current_app.config.get('READ_REPLICAS', ()) if key in engines]
+    if not replicas or request.method not in READ_METHODS:
+        return None
+    # Read-your-writes: a client that just wrote keeps reading from the primary
+    if current_app.config.get('READ_REPLICA_PIN_SECONDS', 0) and any(cache.get_many(*_pin_keys())):
+        return None
+
+    health = replica_health()
+    start = health.next_turn()
+    for i in range(len(replicas)):
+        key = replicas[(start + i) % len(replicas)]
+        if health.is_healthy(key, engines[key]):
+            return engines[key]
+    return None
+
+def _read_engine(engines):
+    """Replica engine for this request's reads, or None for the primary.
+
+    Decided once per request, so a response's reads see the same database; it is
+    only decided again when token_required identifies the principal, whose pin
+    may send the rest of the request to the primary.
+    """
+    principal = g.get('customer_id')
+    if not hasattr(request, '_read_engine') or getattr(request, '_read_principal', None) != principal:
+        request._read_engine = None if getattr(request, '_read_primary', False) else _choose_replica(engines)
+        request._read_principal = principal
+    return request._read_engine
+
+def read_from_primary():
+    """Send the rest of this request's reads to the primary, e.g. to fill a cache entry after a write"""
+    if has_request_context():
+        request._read_primary = True
+        request._read_engine = None
+
+class RoutingSession(Session):
+    """Session that sends the reads of GET requests to a read replica (READ_REPLICAS).
+
+    Flushes, INSERT/UPDATE/DELETE statements and anything outside a request
+    stay on the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and has_request_context():
+            engine = _read_engine(self._db.engines)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def pin_after_write(response):
+    """after_request hook: keep a client that just wrote on the primary for READ_REPLICA_PIN_SECONDS"""
+    pin_seconds = current_app.config.get('READ_REPLICA_PIN_SECONDS', 0)
+    if (pin_seconds and current_app.config.get('READ_REPLICAS')
+            and request.method not in READ_METHODS and response.status_code < 400):
+        cache.set_many(dict.fromkeys(_pin_keys(), 1), timeout=pin_seconds)
+    return response
@@ -0,0 +1,163 @@
+from flask import current_app, jsonify, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from json.encoder import encode_basestring_ascii
+from marshmallow import fields
+from sqlalchemy import select
+from Application.models import db
+import json, math
+
+# Streaming form of a list: one JSON object per line
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_stream():
+    """True for ?stream=1, or when the client prefers NDJSON to JSON in its Accept header"""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+class InvalidFields(ValueError):
+    """Raised for a ?fields= list naming fields the schema does not dump"""
+    def __init__(self, unknown, available):
+        super().__init__(f"Unknown field(s): {', '.join(unknown)}. Available fields: {', '.join(available)}")
+
+class InvalidExpand(ValueError):
+    """Raised for an ?expand= name that is not an expandable relationship"""
+    def __init__(self, unknown, available):
+        super().__init__(f"Cannot expand {', '.join(unknown)}. Expandable: {', '.join(available)}")
+
+def parse_expand(value, expandable):
+    """Set of names from an ?expand=a,b value, each checked against `expandable`"""
+    names = {name.strip() for name in (value or '').split(',') if name.strip()}
+    unknown = sorted(names - set(expandable))
+    if unknown:
+        raise InvalidExpand(unknown, list(expandable))
+    return names
+
+def _json_float(value):
+    # Same text as json.dumps, which only spells out the non-finite values
+    return repr(value) if math.isfinite(value) else json.dumps(value)
+
+# Per field type: (Python value, JSON text) expressions for a non-null column value {v}.
+# Each mirrors the field's _serialize() with default options.
+_FIELD_TYPES = {
+    fields.Integer: ('int({v})', 'str(int({v}))'),
+    fields.Float: ('float({v})', '_json_float(float({v}))'),
+    fields.String: ('str({v})', '_escape(str({v}))'),
+    fields.Date: ('{v}.isoformat()', '\'"\' + {v}.isoformat() + \'"\''),
+}
+
+def _field_expressions(name, field):
+    # Exact types only: a subclass (Email, Url, ...) may serialize differently
+    if type(field) not in _FIELD_TYPES:
+        raise TypeError(f"Field '{name}' ({type(field).__name__}) is not supported by RowSerializer")
+    if getattr(field, 'as_string', False) or getattr(field, 'format', None) not in (None, 'iso'):
+        raise TypeError(f"Field '{name}' uses options RowSerializer does not support")
+    return _FIELD_TYPES[type(field)]
+
+class RowSerializer:
+    """Flat serializer for Core rows, generated once from a schema's dump fields.
+
+    serializer.select() fetches exactly the columns the schema dumps;
+    dump() then builds the same dicts as schema.dump() and jsonify() writes
+    the same bytes as schema.jsonify(), without per-field marshmallow calls
+    or ORM objects. Field types it cannot reproduce exactly raise TypeError
+    at import time rather than drift at runtime.
+    """
+
+    def __init__(self, schema):
+        model = schema.opts.model
+        dump_fields = list(schema.dump_fields.items())
+
+        self.schema = schema
+        self.keys = [field.data_key or name for name, field in dump_fields]
+        self._names = {key: name for key, (name, _) in zip(self.keys, dump_fields)}
+        self._projections = {}
+        self.columns = [getattr(model, field.attribute or name) for name, field in dump_fields]
+
+        expressions = [_field_expressions(name, field) for name, field in dump_fields]
+        namespace = {'_json_float': _json_float, '_escape': encode_basestring_ascii}
+
+        def value(i, expr):
+            return f"(None if r[{i}] is None else {expr.format(v=f'r[{i}]')})"
+
+        def text(i, expr):
+            return f"('null' if r[{i}] is None else {expr.format(v=f'r[{i}]')})"
+
+        # Dict in the schema's field order
+        items = ', '.join(f'{key!r}: {value(i, expr)}' for i, (key, (expr, _)) in enumerate(zip(self.keys, expressions)))
+        # JSON text with sorted keys, laid out as Flask's provider does (compact or indent=2)
+        ordered = sorted(range(len(self.keys)), key=lambda i: self.keys[i])
+        compact = " + ',' + ".join(f'{json.dumps(self.keys[i]) + ":"!r} + {text(i, expressions[i][1])}' for i in ordered)
+        indented = " + ',\\n' + ".join(f'{"    " + json.dumps(self.keys[i]) + ": "!r} + {text(i, expressions[i][1])}' for i in ordered)
+
+        exec(
+            f'def to_dict(r):\n    return {{{items}}}\n'
+            f'def to_compact(r):\n    return \'{{\' + {compact} + \'}}\'\n'
+            f'def to_indented(r):\n    return \'  {{\\n\' + {indented} + \'\\n  }}\'\n',
+            namespace
+        )
+        self.to_dict = namespace['to_dict']
+        self._to_compact = namespace['to_compact']
+        self._to_indented = namespace['to_indented']
+
+    def project(self, fields):
+        """Serializer for the subset of fields in a ?fields=id,name value.
+
+        An empty value means every field; unknown names raise InvalidFields.
+        Each subset is generated once, and its output keeps the schema's field order.
+        """
+        requested = frozenset(key.strip() for key in (fields or '').split(',') if key.strip())
+        if not requested or requested == set(self.keys):
+            return self
+
+        unknown = sorted(requested - set(self.keys))
+        if unknown:
+            raise InvalidFields(unknown, self.keys)
+
+        projected = self._projections.get(requested)
+        if projected is None:
+            only = [self._names[key] for key in self.keys if key in requested]
+            projected = self._projections.setdefault(requested, RowSerializer(type(self.schema)(many=True, only=only)))
+        return projected
+
+    def select(self, *extra):
+        """select() of the dumped columns, followed by any `extra` ones (cursor keys) not among them"""
+        columns = list(self.columns)
+        columns += [column for column in extra if column is not None and all(column is not own for own in columns)]
+        return select(*columns)
+
+    def dump(self, rows):
+        """Same as schema.dump(objects, many=True), for rows of self.select()"""
+        return [self.to_dict(row) for row in rows]
+
+    def jsonify(self, rows):
+        """Same response as schema.jsonify(objects), for rows of self.select()"""
+        provider = current_app.json
+        if type(provider) is not DefaultJSONProvider or not provider.ensure_ascii or not provider.sort_keys:
+            return jsonify(self.dump(rows))
+
+        if provider.compact is False or (provider.compact is None and current_app.debug):
+            body = '[\n' + ',\n'.join(map(self._to_indented, rows)) + '\n]' if rows else '[]'
+        else:
+            body = '[' + ','.join(map(self._to_compact, rows)) + ']'
+        return current_app.response_class(f'{body}\n', mimetype=provider.mimetype)
+
+    def stream(self, query):
+        """NDJSON response with every row of `query`, a self.select().
+
+        Rows are fetched STREAM_BATCH_SIZE at a time (yield_per, which uses a
+        server-side cursor where the driver has one) and each batch is written
+        out as soon as it is serialized, so memory does not grow with the table.
+        """
+        batch_size = current_app.config.get('STREAM_BATCH_SIZE', 500)
+
+        @stream_with_context
+        def generate():
+            result = db.session.execute(query.execution_options(yield_per=batch_size))
+            for rows in result.partitions():
+                yield ''.join([f'{self._to_compact(row)}\n' for row in rows])
+
+        resp = current_app.response_class(generate(), mimetype=NDJSON_MIMETYPE)
+        # Ask reverse proxies to pass chunks through instead of buffering the whole body
+        resp.headers['X-Accel-Buffering'] = 'no'
+        return resp
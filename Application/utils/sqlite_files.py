@@ -0,0 +1,16 @@
+import os, sqlite3
+
+def thread_connection(local, path):
+    """Connection to a shared SQLite file for this thread, kept on `local` (a threading.local).
+
+    Reopened after a fork so workers never share a handle; WAL lets readers
+    carry on while one worker writes.
+    """
+    conn = getattr(local, 'conn', None)
+    if conn is None or local.pid != os.getpid():
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        local.conn = conn
+        local.pid = os.getpid()
+    return conn
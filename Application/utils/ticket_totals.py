@@ -0,0 +1,94 @@
+from flask import current_app
+from sqlalchemy import select, func
+from Application.models import Service_Tickets, Service_Inventory, Inventory, db
+from Application.extensions import cache
+from Application.utils.cache_utils import get_tag_generations, claim_tag_generation, invalidate_cache_pattern, recently_bumped
+from Application.utils.read_replicas import read_from_primary
+
+# Each ticket's parts cost is cached under its own tag, so one ticket can be invalidated alone,
+# and records the generation of each part's 'inventory:<id>' tag, so a price change is one bump
+TOTAL_TAG_PREFIX = 'ticket_total:'
+
+def _total_key(ticket_id, generation):
+    return f'{TOTAL_TAG_PREFIX}{ticket_id}@{generation}'
+
+def _part_tags(part_ids):
+    return [f'inventory:{part_id}' for part_id in part_ids]
+
+def _compute_totals(ticket_ids):
+    """SUM(price * quantity) per ticket in one grouped query; tickets without parts total 0"""
+    query = (
+        select(Service_Tickets.id, func.coalesce(func.sum(Inventory.price * Service_Inventory.quantity), 0))
+        .outerjoin(Service_Inventory, Service_Inventory.ticket_id == Service_Tickets.id)
+        .outerjoin(Inventory, Inventory.id == Service_Inventory.inventory_id)
+        .where(Service_Tickets.id.in_(ticket_ids))
+        .group_by(Service_Tickets.id)
+    )
+    return {ticket_id: round(float(total), 2) for ticket_id, total in db.session.execute(query)}
+
+def _ticket_parts(ticket_ids):
+    """{ticket_id: [inventory_id, ...]} from the junction table's primary key"""
+    parts = {}
+    query = select(Service_Inventory.ticket_id, Service_Inventory.inventory_id).where(
+        Service_Inventory.ticket_id.in_(ticket_ids))
+    for ticket_id, inventory_id in db.session.execute(query):
+        parts.setdefault(ticket_id, []).append(inventory_id)
+    return parts
+
+def _timeout():
+    return current_app.config.get('TICKET_TOTAL_CACHE_TIMEOUT', 3600)
+
+def ticket_totals(ticket_ids):
+    """Parts cost of each ticket, {ticket_id: total}; tickets that do not exist are left out.
+
+    Cached totals are read in one round trip, and the part generations they
+    recorded in one more; only the misses, and totals whose parts were
+    repriced since, are summed in SQL. Generations are only created for
+    tickets the query found, so probing unknown ids leaves nothing behind.
+    """
+    ticket_ids = list(dict.fromkeys(ticket_ids))
+    if not ticket_ids:
+        return {}
+
+    tags = [f'{TOTAL_TAG_PREFIX}{ticket_id}' for ticket_id in ticket_ids]
+    generations = dict(zip(ticket_ids, get_tag_generations(tags, lifetime=_timeout(), create=False)))
+    keys = {ticket_id: _total_key(ticket_id, generation)
+            for ticket_id, generation in generations.items() if generation is not None}
+    cached = {ticket_id: entry for ticket_id, entry in zip(keys, cache.get_many(*keys.values())) if entry}
+
+    # A cached total holds only while every part keeps the generation it was summed under
+    part_ids = list({part_id for _, parts in cached.values() for part_id in parts})
+    current = dict(zip(part_ids, get_tag_generations(_part_tags(part_ids), lifetime=_timeout(), create=False)))
+    totals = {ticket_id: total for ticket_id, (total, parts) in cached.items()
+              if all(current[part_id] == generation for part_id, generation in parts.items())}
+
+    missing = [ticket_id for ticket_id in ticket_ids if ticket_id not in totals]
+    if missing:
+        # Part generations are read before the sum, so a price change made meanwhile still wins
+        parts = _ticket_parts(missing)
+        part_ids = list({part_id for ids in parts.values() for part_id in ids})
+        part_generations = dict(zip(part_ids, get_tag_generations(_part_tags(part_ids), lifetime=_timeout())))
+        if recently_bumped([generations[ticket_id] for ticket_id in missing if generations[ticket_id]]
+                           + list(part_generations.values())):
+            read_from_primary()
+        computed = _compute_totals(missing)
+
+        to_store = {}
+        for ticket_id, total in computed.items():
+            if ticket_id not in keys:
+                generation = claim_tag_generation(f'{TOTAL_TAG_PREFIX}{ticket_id}', lifetime=_timeout())
+                if generation is None:
+                    continue
+                keys[ticket_id] = _total_key(ticket_id, generation)
+            to_store[keys[ticket_id]] = (total, {part_id: part_generations[part_id]
+                                                 for part_id in parts.get(ticket_id, ())})
+        if to_store:
+            # Ticket generations were read before the query or claimed after it, so a concurrent invalidation wins
+            cache.set_many(to_store, timeout=_timeout())
+        totals.update(computed)
+
+    return {ticket_id: totals[ticket_id] for ticket_id in ticket_ids if ticket_id in totals}
+
+def invalidate_ticket_totals(ticket_ids):
+    """Drop the cached totals of these tickets; repriced or deleted parts only need their inventory:<id> bump"""
+    invalidate_cache_pattern(*(f'{TOTAL_TAG_PREFIX}{ticket_id}' for ticket_id in ticket_ids), lifetime=_timeout())
@@ -1,17 +1,23 @@
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 from Application.models import Customers, db
-import os
+from Application.extensions import cache
+from Application.utils.lru_cache import LRUCache
+import hashlib, hmac, os, time
 
 SECRET_KEY = os.getenv('SECRET', 'default_secret')
+TOKEN_LIFETIME = timedelta(hours=24)
+
+# Deleted customers are listed under this prefix for as long as their tokens can live
+REVOKED_KEY_PREFIX = 'revoked_customer:'
 
 def encode_token(customer_id):
     """Create a JWT token for a customer"""
     payload = {
         'customer_id': customer_id,
-        'exp': datetime.now() + timedelta(hours=24),
+        'exp': datetime.now() + TOKEN_LIFETIME,
         'iat': datetime.now(),
         'type': 'customer'
     }
@@ -19,14 +25,89 @@ def encode_token(customer_id):
     token = jwt.encode(payload, SECRET_KEY, algorithm='HS256')
     return token
 
-def decode_token(token):
-    """Decode & validate JWT token"""
+def _verify_token(token):
+    """Full signature and claims check, with the configured JWT_BACKEND"""
+    if current_app.config.get('JWT_BACKEND', 'jose') == 'pyjwt':
+        # PyJWT is optional and only needed when selected
+        import jwt as pyjwt
+        try:
+            return pyjwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        except pyjwt.PyJWTError:
+            return None
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-        return payload
+        return jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
     except JWTError:
         return None
 
+def token_cache():
+    """This worker's LRU of verified tokens, keyed by SHA-256 of the token (TOKEN_CACHE_SIZE)"""
+    tokens = current_app.extensions.get('token_cache')
+    if tokens is None:
+        tokens = current_app.extensions.setdefault('token_cache', LRUCache(
+            maxsize=current_app.config.get('TOKEN_CACHE_SIZE', 4096),
+            timeout=int(TOKEN_LIFETIME.total_seconds())
+        ))
+    return tokens
+
+def decode_token(token):
+    """Decode & validate JWT token.
+
+    Verified payloads are remembered until the token's exp, so a client
+    resending the same token skips the base64/JSON/HMAC work.
+    """
+    tokens = token_cache()
+    key = hashlib.sha256(token.encode()).digest()
+    payload = tokens.get(key)
+    if payload is not None:
+        return dict(payload)
+
+    payload = _verify_token(token)
+    if payload is not None and isinstance(payload.get('exp'), (int, float)):
+        tokens.set(key, payload, timeout=payload['exp'] - time.time())
+    return payload
+
+def principal_cache():
+    """This worker's LRU of customer ids known to exist (PRINCIPAL_CACHE_SIZE / _TTL)"""
+    principals = current_app.extensions.get('principal_cache')
+    if principals is None:
+        principals = current_app.extensions.setdefault('principal_cache', LRUCache(
+            maxsize=current_app.config.get('PRINCIPAL_CACHE_SIZE', 4096),
+            timeout=current_app.config.get('PRINCIPAL_CACHE_TTL', 30)
+        ))
+    return principals
+
+def _revoked_key(customer_id):
+    return f'{REVOKED_KEY_PREFIX}{customer_id}'
+
+def principal_exists(customer_id):
+    """Whether the customer behind a verified token still exists.
+
+    A revocation in the shared cache wins over everything, so a delete is seen
+    by every worker at once; otherwise a recent positive answer from the LRU
+    saves the primary-key query.
+    """
+    if cache.get(_revoked_key(customer_id)):
+        return False
+
+    principals = principal_cache()
+    if principals.get(customer_id):
+        return True
+
+    exists = db.session.get(Customers, customer_id) is not None
+    if exists:
+        principals.set(customer_id, True)
+    return exists
+
+def revoke_principal(customer_id):
+    """Reject this customer's tokens on every worker; call when the customer is deleted"""
+    cache.set(_revoked_key(customer_id), 1, timeout=int(TOKEN_LIFETIME.total_seconds()))
+    principal_cache().delete(customer_id)
+
+def restore_principal(customer_id):
+    """Drop a revocation left by a deleted customer whose id has been reused"""
+    cache.delete(_revoked_key(customer_id))
+
 def token_required(f):
     """Decorator to require valid JWT token"""
     @wraps(f)
@@ -55,12 +136,30 @@ def token_required(f):
         if not customer_id:
             return jsonify({'error': 'Invalid token payload'}), 401
         
-        # Verify customer exists
-        customer = db.session.get(Customers, customer_id)
-        if not customer:
+        # Verify customer exists, from the principal cache where possible
+        if not principal_exists(customer_id):
             return jsonify({'error': 'Customer not found'}), 404
         
-        # Pass customer_id to the decorated function
+        # Expose the principal to per-customer caching, then pass customer_id on
+        g.customer_id = customer_id
         return f(customer_id, *args, **kwargs)
     
-    return decorated
\ No newline at end of file
+    return decorated
+
+def admin_required(f):
+    """Decorator to require the operator API key (ADMIN_API_KEY) in the X-Admin-Key header"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        admin_key = current_app.config.get('ADMIN_API_KEY')
+        if not admin_key:
+            return jsonify({'error': 'Admin API is disabled'}), 403
+
+        provided = request.headers.get('X-Admin-Key')
+        if not provided:
+            return jsonify({'error': 'X-Admin-Key header is missing'}), 401
+        if not hmac.compare_digest(provided.encode(), admin_key.encode()):
+            return jsonify({'error': 'Invalid admin key'}), 401
+
+        return f(*args, **kwargs)
+
+    return decorated
@@ -0,0 +1,26 @@
+-- 001: store service_tickets.service_date as DATE and index it (MySQL 8)
+--
+-- Existing values were free-form strings. 'YYYY-MM-DD', 'YYYY.MM.DD' and
+-- 'YYYY/MM/DD' are normalised; check for anything else first with:
+--   SELECT id, service_date FROM service_tickets
+--   WHERE service_date NOT REGEXP '^[0-9]{4}[-./][0-9]{2}[-./][0-9]{2}$';
+--
+-- The ticket rows are converted into a new column so a failed conversion
+-- leaves the original data in place until the final swap.
+
+ALTER TABLE service_tickets ADD COLUMN service_date_new DATE NULL;
+
+UPDATE service_tickets
+SET service_date_new = STR_TO_DATE(REPLACE(REPLACE(service_date, '.', '-'), '/', '-'), '%Y-%m-%d');
+
+ALTER TABLE service_tickets
+    DROP COLUMN service_date,
+    CHANGE COLUMN service_date_new service_date DATE NOT NULL;
+
+ALTER TABLE service_tickets ADD INDEX ix_service_tickets_service_date (service_date), ALGORITHM=INPLACE, LOCK=NONE;
+
+-- No indexes are added for service_tickets.customer_id, service_mechanics.mechanic_id
+-- or service_inventory.inventory_id: InnoDB already keeps one for each foreign key,
+-- and a second copy under the model's name would only slow every write down.
+-- (A database built by create_all() gets the model's named index instead, which
+-- InnoDB then uses for the foreign key.)
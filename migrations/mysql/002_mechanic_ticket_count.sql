@@ -0,0 +1,16 @@
+-- 002: maintained per-mechanic ticket counter for GET /mechanics/ranking (MySQL 8)
+--
+-- The ticket routes keep mechanics.ticket_count in step with service_mechanics
+-- from now on; this backfills the current counts and indexes the ranking order.
+
+ALTER TABLE mechanics ADD COLUMN ticket_count INT NOT NULL DEFAULT 0, ALGORITHM=INSTANT;
+
+UPDATE mechanics m
+JOIN (
+    SELECT mechanic_id, COUNT(*) AS tickets
+    FROM service_mechanics
+    GROUP BY mechanic_id
+) c ON c.mechanic_id = m.id
+SET m.ticket_count = c.tickets;
+
+ALTER TABLE mechanics ADD INDEX ix_mechanics_ticket_count (ticket_count DESC, id), ALGORITHM=INPLACE, LOCK=NONE;
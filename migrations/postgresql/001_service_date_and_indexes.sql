@@ -0,0 +1,24 @@
+-- 001: store service_tickets.service_date as DATE and add hot-path indexes (PostgreSQL)
+--
+-- Existing values were free-form strings. 'YYYY-MM-DD', 'YYYY.MM.DD' and
+-- 'YYYY/MM/DD' are normalised; check for anything else first with:
+--   SELECT id, service_date FROM service_tickets
+--   WHERE service_date !~ '^\d{4}[-./]\d{2}[-./]\d{2}$';
+--
+-- Run outside a transaction block (psql -f), because CREATE INDEX
+-- CONCURRENTLY cannot run inside one and keeps the tables writable.
+
+BEGIN;
+ALTER TABLE service_tickets
+    ALTER COLUMN service_date TYPE DATE
+    USING to_date(translate(service_date, './', '--'), 'YYYY-MM-DD');
+COMMIT;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_service_tickets_service_date
+    ON service_tickets (service_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_service_tickets_customer_id
+    ON service_tickets (customer_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_service_mechanics_mechanic_id
+    ON service_mechanics (mechanic_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_service_inventory_inventory_id
+    ON service_inventory (inventory_id);
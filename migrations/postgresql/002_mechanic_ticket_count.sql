@@ -0,0 +1,21 @@
+-- 002: maintained per-mechanic ticket counter for GET /mechanics/ranking (PostgreSQL)
+--
+-- The ticket routes keep mechanics.ticket_count in step with service_mechanics
+-- from now on; this backfills the current counts and indexes the ranking order.
+
+BEGIN;
+ALTER TABLE mechanics
+    ADD COLUMN IF NOT EXISTS ticket_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE mechanics m
+SET ticket_count = c.tickets
+FROM (
+    SELECT mechanic_id, COUNT(*) AS tickets
+    FROM service_mechanics
+    GROUP BY mechanic_id
+) c
+WHERE c.mechanic_id = m.id;
+COMMIT;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mechanics_ticket_count
+    ON mechanics (ticket_count DESC, id);
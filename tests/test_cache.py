@@ -0,0 +1,234 @@
+from Application.utils.cache_backends import SQLiteCache, LocalRedis, LocalRedisCache
+from Application.utils.cache_envelope import compress_variants, pack_envelope, unpack_envelope
+from Application.utils.cache_utils import cache_response, response_l1, tag_timeout, invalidate_cache_pattern, cache_key_generator
+from Application.utils.lru_cache import LRUCache
+from Application.extensions import cache
+from flask import Flask, jsonify
+from unittest import mock
+import unittest, tempfile, gzip, threading, time, sys, os
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+class TestSQLiteCache(unittest.TestCase):
+    def setUp(self):
+        """Create a throwaway cache file"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    # Two handles on the same file behave like two workers
+    def test_shared_between_instances(self):
+        other = SQLiteCache(self.path)
+        self.cache.set('customers', {'body': 'x'})
+        self.assertEqual(other.get('customers'), {'body': 'x'})
+
+        other.delete('customers')
+        self.assertIsNone(self.cache.get('customers'))
+
+    def test_add_is_first_writer_wins(self):
+        self.assertTrue(self.cache.add('tag:tickets', 'a', timeout=0))
+        self.assertFalse(self.cache.add('tag:tickets', 'b', timeout=0))
+        self.assertEqual(self.cache.get('tag:tickets'), 'a')
+
+    def test_expiry_and_many(self):
+        self.cache.set('short', 1, timeout=1)
+        self.cache.set_many({'a': 1, 'b': 2}, timeout=0)
+        self.assertEqual(self.cache.get_many('a', 'missing', 'b'), [1, None, 2])
+        time.sleep(1.1)
+        self.assertIsNone(self.cache.get('short'))
+        # An expired row can be claimed again by add()
+        self.assertTrue(self.cache.add('short', 2))
+
+    def test_inc(self):
+        self.assertEqual(self.cache.inc('hits'), 1)
+        self.assertEqual(self.cache.inc('hits', 5), 6)
+        self.assertEqual(self.cache.dec('hits'), 5)
+
+class TestLocalRedisCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LocalRedisCache(LocalRedis(), key_prefix='test:')
+
+    def test_round_trip(self):
+        self.cache.set_many({'a': {'x': 1}, 'b': 2})
+        self.assertEqual(self.cache.get_many('a', 'b', 'c'), [{'x': 1}, 2, None])
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.cache.add('lock', 1))
+        self.assertEqual(self.cache.inc('counter'), 1)
+        self.assertTrue(self.cache.delete('a'))
+        self.assertIsNone(self.cache.get('a'))
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction_and_ttl(self):
+        lru = LRUCache(maxsize=2, timeout=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        # 'b' was least recently used
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+
+        lru.set('short', 4, timeout=0.05)
+        time.sleep(0.1)
+        self.assertIsNone(lru.get('short'))
+
+        stats = lru.stats()
+        self.assertEqual(stats['evictions'], 2)
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['hits'], 2)
+
+class TestCacheEnvelope(unittest.TestCase):
+    def test_pack_round_trip(self):
+        body = b'{"customers": []}' * 100
+        bodies = compress_variants(body, min_size=0)
+        self.assertEqual(gzip.decompress(bodies['gzip']), body)
+
+        packed = pack_envelope(200, 123.5, 'abc', [('Content-Type', 'application/json')], bodies)
+        entry = unpack_envelope(packed)
+        self.assertEqual(entry.status, 200)
+        self.assertEqual(entry.expires, 123.5)
+        self.assertEqual(entry.etag, 'abc')
+        self.assertEqual(entry.headers, [('Content-Type', 'application/json')])
+        self.assertEqual(entry.bodies, bodies)
+
+    def test_small_bodies_stay_uncompressed(self):
+        self.assertEqual(list(compress_variants(b'{}')), ['identity'])
+
+    def test_unknown_data_is_a_miss(self):
+        self.assertIsNone(unpack_envelope(None))
+        self.assertIsNone(unpack_envelope('{"body": ""}'))
+
+class TestCacheResponse(unittest.TestCase):
+    def setUp(self):
+        """Small app with slow cached views that count how often they run"""
+        self.app = Flask(__name__)
+        self.app.config.update(CACHE_TYPE='SimpleCache', CACHE_LOCK_TIMEOUT=5)
+        cache.init_app(self.app)
+        self.calls = 0
+
+        @self.app.route('/slow')
+        @cache_response(timeout=60)
+        def slow():
+            self.calls += 1
+            time.sleep(0.2)
+            return jsonify(calls=self.calls)
+
+        @self.app.route('/stale')
+        @cache_response(timeout=1, stale=30)
+        def stale():
+            self.calls += 1
+            return jsonify(calls=self.calls)
+
+    # Concurrent misses on one key run the view once
+    def test_single_flight(self):
+        results = []
+        def fetch():
+            results.append(self.app.test_client().get('/slow').json['calls'])
+
+        threads = [threading.Thread(target=fetch) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [1] * 5)
+
+    # When another worker's fill ends without an entry, waiters go ahead as soon as its lock is released
+    def test_wait_ends_when_lock_released(self):
+        @self.app.route('/gone')
+        @cache_response(timeout=60)
+        def gone():
+            self.calls += 1
+            return jsonify(error='not found'), 404
+
+        with self.app.test_request_context('/gone'):
+            lock_key = f'lock:{cache_key_generator()}'
+            cache.set(lock_key, 1)
+        def other_worker_done():
+            # Its 404 is never stored; it just releases the lock
+            with self.app.app_context():
+                cache.delete(lock_key)
+
+        release = threading.Timer(0.2, other_worker_done)
+        release.start()
+
+        started = time.time()
+        response = self.app.test_client().get('/gone')
+        release.join()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.calls, 1)
+        self.assertLess(time.time() - started, 1)
+
+    # Expired entries are served while a background refresh runs
+    def test_stale_while_revalidate(self):
+        client = self.app.test_client()
+        self.assertEqual(client.get('/stale').json['calls'], 1)
+
+        time.sleep(1.1)
+        self.assertEqual(client.get('/stale').json['calls'], 1)
+
+        # Wait for the background refresh to store the new body
+        deadline = time.time() + 5
+        while self.calls < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.1)
+        self.assertEqual(client.get('/stale').json['calls'], 2)
+
+    # Repeat hits are answered by the in-process tier
+    def test_l1_hit(self):
+        client = self.app.test_client()
+        client.get('/slow')
+        client.get('/slow')
+        self.assertEqual(self.calls, 1)
+        with self.app.app_context():
+            self.assertEqual(response_l1().stats()['hits'], 1)
+
+    # ?fields= lists in any order share one entry
+    def test_field_set_normalized_in_key(self):
+        client = self.app.test_client()
+        client.get('/slow?fields=name,id')
+        client.get('/slow?fields=id,%20name,name')
+        self.assertEqual(self.calls, 1)
+        client.get('/slow?fields=id')
+        self.assertEqual(self.calls, 2)
+
+    # Tag generations expire, but only after every entry that could use them
+    def test_tag_generations_expire(self):
+        @self.app.route('/tagged/<int:item_id>')
+        @cache_response(timeout=60, tags=('item:{item_id}',))
+        def tagged(item_id):
+            return jsonify(item=item_id)
+
+        self.app.test_client().get('/tagged/7')
+        with self.app.app_context():
+            expires, _ = cache.cache._cache['tag:item:7']
+            self.assertGreater(expires, time.time() + 60)
+            self.assertGreater(tag_timeout(), 60)
+
+    # With tag generations held in-process, an L1 hit never touches the backend
+    def test_l1_hit_skips_backend(self):
+        self.app.config.update(CACHE_TAG_L1_TIMEOUT=5, CACHE_STALE_WHILE_REVALIDATE=30)
+
+        @self.app.route('/hot')
+        @cache_response(timeout=60, tags=('hot',))
+        def hot():
+            self.calls += 1
+            return jsonify(calls=self.calls)
+
+        client = self.app.test_client()
+        client.get('/hot')
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'get', wraps=cache.get) as get:
+            self.assertEqual(client.get('/hot').json['calls'], 1)
+            self.assertEqual(get_many.call_count + get.call_count, 0)
+
+        # An invalidation in this worker is seen on the next request
+        with self.app.app_context():
+            invalidate_cache_pattern('hot')
+        self.assertEqual(client.get('/hot').json['calls'], 2)
@@ -1,8 +1,12 @@
 from Application import create_app
 from Application.models import  db, Customers, Service_Tickets
 from datetime import datetime
-from Application.utils.token_utils import encode_token
+from Application.utils.token_utils import encode_token, decode_token, principal_cache, token_cache
 import unittest, json, sys, os
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+from Application.utils.password_utils import hash_password, _pool, HashingBusy
+from Application.utils import password_utils
 
 # Add project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -105,6 +109,21 @@ class TestCustomer(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json['email'],['Missing data for required field.'])
     
+    # Duplicate email or phone is caught by the unique constraints
+    def test_duplicate_customer(self):
+        payload = dict(self.test_customer_data, phone="555-000-1111")
+        response = self.client.post('/customers', json=payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], "Email already associated with an account")
+
+        payload = dict(self.test_customer_data, email="other@email.com")
+        response = self.client.post('/customers', json=payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], "Phone number already associated with an account")
+
+        # The failed inserts leave the session usable
+        self.assertEqual(self.client.get('/customers').status_code, 200)
+    
     # Token authentication update
     def test_update_customer(self):
         update_payload ={
@@ -158,6 +177,49 @@ class TestCustomer(unittest.TestCase):
         self.assertEqual(response.status_code, 401)
         self.assertEqual(response.json['message'], 'Invalid email or password!')
 
+    # A hash made with outdated parameters is replaced on a successful login
+    def test_login_rehashes_outdated_password(self):
+        customer = db.session.execute(select(Customers)).scalars().first()
+        customer.password = generate_password_hash("testpass", method="pbkdf2:sha256:500")
+        db.session.commit()
+
+        credentials = {"email": "test@email.com", "password": "testpass"}
+        response = self.client.post('/customers/login', json=credentials)
+        self.assertEqual(response.status_code, 200)
+
+        db.session.refresh(customer)
+        self.assertTrue(customer.password.startswith(self.app.config['PASSWORD_HASH_METHOD'] + '$'))
+        self.assertEqual(self.client.post('/customers/login', json=credentials).status_code, 200)
+
+    # With a process pool configured, hashing is offloaded and bounded
+    def test_password_hash_pool_backpressure(self):
+        self.app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0, PASSWORD_HASH_WAIT=0)
+        self.assertTrue(hash_password("pw").startswith('pbkdf2:sha256:1000$'))
+
+        # Hold the only slot, as a long-running hash would
+        _, slots = _pool()
+        slots.acquire()
+        try:
+            with self.assertRaises(HashingBusy):
+                hash_password("pw")
+            response = self.client.post('/customers/login', json={"email": "test@email.com", "password": "testpass"})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers.get('Retry-After'), '1')
+        finally:
+            slots.release()
+
+    # The pool is built at app set-up, and rebuilt when its size settings change
+    def test_password_hash_pool_settings(self):
+        self.app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+        password_utils.init_app(self.app)
+        executor, slots = _pool()
+        self.assertEqual(executor._mp_context.get_start_method(), password_utils._context().get_start_method())
+
+        self.app.config['PASSWORD_HASH_QUEUE'] = 3
+        self.assertIsNot(_pool()[1], slots)
+        self.assertTrue(hash_password("pw").startswith('pbkdf2:sha256:1000$'))
+        self.assertEqual(len([key for key in password_utils._pools if key[0] == os.getpid()]), 1)
+
     # Delete customer test
     def test_delete_customer(self):
         # First, get all customers to find a valid ID
@@ -176,4 +238,146 @@ class TestCustomer(unittest.TestCase):
         self.assertEqual(follow_up.status_code, 404)
         self.assertIn('Customer not found', follow_up.json['error'])
     
-        
\ No newline at end of file
+    # A token is verified once, then served from the token cache
+    def test_verified_token_cache(self):
+        customer = db.session.execute(select(Customers)).scalars().first()
+        token = encode_token(customer.id)
+        headers = {'Authorization': f'Bearer {token}'}
+
+        self.assertEqual(self.client.get('/customers/my-tickets', headers=headers).status_code, 200)
+        self.assertEqual(self.client.get('/customers/my-tickets', headers=headers).status_code, 200)
+        stats = token_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+        self.assertEqual(decode_token(token)['customer_id'], customer.id)
+
+        # A tampered token is never cached and still fails verification
+        tampered = token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB')
+        response = self.client.get('/customers/my-tickets', headers={'Authorization': f'Bearer {tampered}'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(token_cache().stats()['size'], 1)
+
+    # Known principals skip the customer lookup until the customer is deleted
+    def test_principal_cache_and_revocation(self):
+        customer = db.session.execute(select(Customers)).scalars().first()
+        headers = {'Authorization': f'Bearer {encode_token(customer.id)}'}
+
+        self.assertEqual(self.client.get('/customers/my-tickets', headers=headers).status_code, 200)
+        self.assertEqual(self.client.get('/customers/my-tickets', headers=headers).status_code, 200)
+        self.assertEqual(principal_cache().stats()['hits'], 1)
+
+        self.assertEqual(self.client.delete(f'/customers/{customer.id}').status_code, 200)
+        # Another worker may still hold the principal; the shared revocation wins
+        principal_cache().set(customer.id, True)
+        response = self.client.get('/customers/my-tickets', headers=headers)
+        self.assertEqual(response.status_code, 404)
+
+        # A new customer that reuses the id is not revoked
+        payload = {"name": "Reuse", "email": "reuse@email.com", "phone": "000-111-2222", "password": "pw"}
+        created = self.client.post('/customers', json=payload)
+        self.assertEqual(created.status_code, 201)
+        headers = {'Authorization': f'Bearer {encode_token(created.json["id"])}'}
+        self.assertEqual(self.client.get('/customers/my-tickets', headers=headers).status_code, 200)
+
+    # Cached customer list is invalidated when a customer is created
+    def test_customer_list_cache_invalidated(self):
+        first = self.client.get('/customers')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json['pagination']['total'], 1)
+
+        payload = {
+            "name": "Jane Doe",
+            "email": "jane@email.com",
+            "phone": "555-123-4567",
+            "password": "anotherpassword"
+        }
+        response = self.client.post('/customers', json=payload)
+        self.assertEqual(response.status_code, 201)
+
+        second = self.client.get('/customers')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json['pagination']['total'], 2)
+
+    # my-tickets is cached per customer and refreshed when that customer gets a ticket
+    def test_my_tickets_cached_per_customer(self):
+        headers = {'Authorization': "Bearer " + self.test_login_customer()}
+        other = Customers(name="Other User", email="other@email.com", phone="222-333-4444")
+        other.set_password("otherpass")
+        db.session.add(other)
+        db.session.commit()
+        other_headers = {'Authorization': "Bearer " + encode_token(other.id)}
+
+        first = self.client.get('/customers/my-tickets', headers=headers)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json, [])
+        self.assertIn('private', first.headers.get('Cache-Control'))
+        self.assertEqual(self.client.get('/customers/my-tickets', headers=other_headers).json, [])
+
+        customer_id = db.session.execute(
+            select(Customers.id).where(Customers.email == self.test_customer_data['email'])
+        ).scalar_one()
+        payload = {
+            "VIN": "MYTICKETVIN1",
+            "service_date": "2025-02-01",
+            "service_desc": "Brake check",
+            "customer_id": customer_id
+        }
+        self.assertEqual(self.client.post('/service-tickets', json=payload).status_code, 201)
+
+        # Only the owning customer's entry was invalidated
+        mine = self.client.get('/customers/my-tickets', headers=headers)
+        self.assertEqual(len(mine.json), 1)
+        self.assertEqual(mine.json[0]['VIN'], "MYTICKETVIN1")
+        self.assertEqual(self.client.get('/customers/my-tickets', headers=other_headers).json, [])
+
+    # Keyset pagination walks the table without OFFSET
+    def test_customers_cursor_pagination(self):
+        for i in range(4):
+            extra = Customers(name=f"Cursor {i}", email=f"cursor{i}@email.com", phone=f"300-000-000{i}")
+            extra.set_password("cursorpass")
+            db.session.add(extra)
+        db.session.commit()
+
+        first = self.client.get('/customers?limit=3&include_total=true')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.json['customers']), 3)
+        self.assertTrue(first.json['pagination']['has_next'])
+        self.assertEqual(first.json['pagination']['total'], 5)
+
+        cursor = first.json['pagination']['next_cursor']
+        second = self.client.get(f'/customers?limit=3&after={cursor}')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.json['customers']), 2)
+        self.assertFalse(second.json['pagination']['has_next'])
+        self.assertIsNone(second.json['pagination']['next_cursor'])
+        self.assertNotIn('total', second.json['pagination'])
+
+        ids = [c['id'] for c in first.json['customers'] + second.json['customers']]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), 5)
+
+        bad = self.client.get('/customers?after=not-a-cursor')
+        self.assertEqual(bad.status_code, 400)
+
+    # A 404 for an id is not cached, so the customer created with it is found
+    def test_missing_customer_not_cached(self):
+        self.assertEqual(self.client.get('/customers/2').status_code, 404)
+        created = self.client.post('/customers', json={
+            "name": "Later User", "email": "later@email.com", "phone": "222-333-4444", "password": "laterpass"
+        })
+        self.assertEqual(created.json['id'], 2)
+        self.assertEqual(self.client.get('/customers/2').status_code, 200)
+
+    # ?fields= in offset, cursor and streaming modes
+    def test_customers_sparse_fieldsets(self):
+        expected = [{'id': 1, 'name': 'Test User'}]
+        self.assertEqual(self.client.get('/customers?fields=name,id').json['customers'], expected)
+        self.assertEqual(self.client.get('/customers?fields=name,id&limit=5').json['customers'], expected)
+
+        streamed = self.client.get('/customers?fields=email&stream=1')
+        self.assertEqual(streamed.get_data(as_text=True), '{"email":"test@email.com"}\n')
+
+        # Write-only and unknown fields are both rejected
+        for fields in ('password', 'name,bogus'):
+            response = self.client.get(f'/customers?fields={fields}')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Available fields', response.json['error'])
@@ -0,0 +1,70 @@
+from Application import create_app
+from Application.models import db, Customers, Service_Tickets, Inventory, Service_Inventory
+from Application.utils.db_utils import upsert, insert_ignore, insert_ignore_many, _portable_upsert, _portable_insert_ignore
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+import unittest, sys, os
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+class TestUpsertHelpers(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("TestConfig")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        customer = Customers(name="Upsert Owner", email="upsert@owner.com", phone="111-222-3333", password="x")
+        db.session.add(customer)
+        db.session.add(Inventory(name="Bolt", price=1.0))
+        db.session.commit()
+        db.session.add(Service_Tickets(VIN="UPSERT01", service_date="2024-01-01", service_desc="Upsert", customer_id=customer.id))
+        db.session.commit()
+        self.row = {"ticket_id": 1, "inventory_id": 1, "quantity": 2}
+
+    def tearDown(self):
+        try:
+            db.session.close()
+            db.drop_all()
+            self.app_context.pop()
+        except Exception as e:
+            print(f"Teardown warning: {e}")
+
+    def quantity(self):
+        return db.session.execute(select(Service_Inventory.quantity)).scalar_one()
+
+    # Native statements and the portable fallback behave the same
+    def test_insert_ignore(self):
+        for helper in (insert_ignore, _portable_insert_ignore):
+            with self.subTest(helper=helper.__name__):
+                self.assertTrue(helper(Service_Inventory, self.row, ['ticket_id', 'inventory_id']))
+                self.assertFalse(helper(Service_Inventory, self.row, ['ticket_id', 'inventory_id']))
+                self.assertEqual(self.quantity(), 2)
+                db.session.rollback()
+
+    # Only the rows that were missing are inserted and reported
+    def test_insert_ignore_many(self):
+        db.session.add(Inventory(name="Nut", price=0.5))
+        db.session.flush()
+        insert_ignore(Service_Inventory, self.row, ['ticket_id', 'inventory_id'])
+        rows = [dict(self.row, inventory_id=1, quantity=9), dict(self.row, inventory_id=2)]
+        inserted = insert_ignore_many(Service_Inventory, rows, ['ticket_id', 'inventory_id'], Service_Inventory.inventory_id)
+        self.assertEqual(inserted, [2])
+        existing = select(Service_Inventory.quantity).where(Service_Inventory.inventory_id == 1)
+        self.assertEqual(db.session.execute(existing).scalar_one(), 2)
+        self.assertEqual(insert_ignore_many(Service_Inventory, [], ['ticket_id', 'inventory_id'], Service_Inventory.inventory_id), [])
+
+    def test_upsert_increments(self):
+        for helper in (upsert, _portable_upsert):
+            with self.subTest(helper=helper.__name__):
+                helper(Service_Inventory, self.row, ['ticket_id', 'inventory_id'], ['quantity'])
+                helper(Service_Inventory, self.row, ['ticket_id', 'inventory_id'], ['quantity'])
+                self.assertEqual(self.quantity(), 4)
+                db.session.rollback()
+
+    # A violation other than the duplicate key is not swallowed
+    def test_other_violations_raise(self):
+        with self.assertRaises(IntegrityError):
+            _portable_insert_ignore(Service_Inventory, dict(self.row, quantity=None), ['ticket_id', 'inventory_id'])
@@ -2,7 +2,7 @@ from Application import create_app
 from Application.models import  db, Customers, Inventory
 from datetime import datetime
 from Application.utils.token_utils import encode_token
-import unittest, json, sys, os
+import unittest, json, gzip, sys, os
 
 # Add project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -160,4 +160,73 @@ class TestInventory(unittest.TestCase):
 
         # 4 - Confirm deletion
         verify_response = self.client.get(f'/inventory/{item_id}')
-        self.assertEqual(verify_response.status_code, 404)
\ No newline at end of file
+        self.assertEqual(verify_response.status_code, 404)
+
+    # Cached list is invalidated by writes
+    def test_list_cache_invalidated_on_update(self):
+        # Prime the cached list
+        first = self.client.get('/inventory')
+        self.assertEqual(first.status_code, 200)
+        item_id = first.json[0]['id']
+
+        response = self.client.put(f'/inventory/{item_id}', json={"name": "Synthetic Oil Change", "price": 59.99})
+        self.assertEqual(response.status_code, 200)
+
+        # The list must reflect the update even though its TTL has not expired
+        second = self.client.get('/inventory')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json[0]['name'], "Synthetic Oil Change")
+
+    # Cached list is served pre-compressed to clients that accept gzip
+    def test_list_served_gzip(self):
+        self.app.config['CACHE_COMPRESS_MIN_SIZE'] = 0
+        plain = self.client.get('/inventory')
+        self.assertEqual(plain.status_code, 200)
+        self.assertIsNone(plain.headers.get('Content-Encoding'))
+
+        compressed = self.client.get('/inventory', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed.status_code, 200)
+        self.assertEqual(compressed.headers.get('Content-Encoding'), 'gzip')
+        self.assertEqual(compressed.headers.get('Vary'), 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+        self.assertNotEqual(compressed.headers.get('ETag'), plain.headers.get('ETag'))
+
+    # Inventory list is paged by cursor, with sort and filters pushed into SQL
+    def test_inventory_pagination_and_sort(self):
+        db.session.add_all([Inventory(name=f"Brake Pad {i}", price=10.0 + i) for i in range(3)])
+        db.session.commit()
+
+        first = self.client.get('/inventory?sort=-price&limit=2')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([item['price'] for item in first.json], [49.99, 29.99])
+        cursor = first.headers.get('X-Next-Cursor')
+        self.assertIsNotNone(cursor)
+        self.assertIn('rel="next"', first.headers.get('Link'))
+
+        second = self.client.get(f'/inventory?sort=-price&limit=2&after={cursor}')
+        self.assertEqual([item['price'] for item in second.json], [12.0, 11.0])
+
+        third = self.client.get(f"/inventory?sort=-price&limit=2&after={second.headers['X-Next-Cursor']}")
+        self.assertEqual([item['price'] for item in third.json], [10.0])
+        self.assertIsNone(third.headers.get('X-Next-Cursor'))
+
+        filtered = self.client.get('/inventory?name=brake&max_price=11')
+        self.assertEqual(sorted(item['name'] for item in filtered.json), ["Brake Pad 0", "Brake Pad 1"])
+
+        self.assertEqual(self.client.get('/inventory?sort=colour').status_code, 400)
+        # A cursor only applies to the sort it was issued for
+        self.assertEqual(self.client.get(f'/inventory?sort=name&after={cursor}').status_code, 400)
+
+    # Page size is capped by the server
+    def test_inventory_limit_capped(self):
+        self.app.config['PAGINATION_MAX_LIMIT'] = 1
+        response = self.client.get('/inventory?limit=50')
+        self.assertEqual(len(response.json), 1)
+        self.assertIn('limit=1', response.headers.get('Link'))
+
+    # A 404 is not cached, so an item created afterwards is found straight away
+    def test_missing_item_not_cached(self):
+        self.assertEqual(self.client.get('/inventory/3').status_code, 404)
+        created = self.client.post('/inventory', json={"name": "Wiper Blades", "price": 15.0})
+        self.assertEqual(created.json['id'], 3)
+        self.assertEqual(self.client.get('/inventory/3').status_code, 200)
@@ -139,4 +139,36 @@ class TestMechanic(unittest.TestCase):
         self.assertIn('message', resp.json)
 
         # Assert deletion
-        self.assertIsNone(db.session.get(Mechanics, mech_id))
\ No newline at end of file
+        self.assertIsNone(db.session.get(Mechanics, mech_id))
+
+    # Ranking follows assignments and honours ?limit=
+    def test_mechanic_ranking(self):
+        customer = Customers(name="Rank Owner", email="rank@owner.com", phone="111-222-3333", password="placeholder")
+        customer.set_password("placeholder")
+        db.session.add(customer)
+        db.session.commit()
+
+        tickets = [Service_Tickets(VIN=f"RANK{i}", service_date="2024-01-0" + str(i + 1),
+                                   service_desc="Ranking ticket", customer_id=customer.id) for i in range(2)]
+        db.session.add_all(tickets)
+        db.session.commit()
+
+        tom, jacob = db.session.query(Mechanics).order_by(Mechanics.id).all()
+        for ticket in tickets:
+            resp = self.client.put(f'/service-tickets/{ticket.id}/assign-mechanic/{jacob.id}')
+            self.assertEqual(resp.status_code, 200)
+        resp = self.client.put(f'/service-tickets/{tickets[0].id}/assign-mechanic/{tom.id}')
+        self.assertEqual(resp.status_code, 200)
+
+        ranking = self.client.get('/mechanics/ranking').json
+        self.assertEqual([m['id'] for m in ranking], [jacob.id, tom.id])
+        self.assertEqual([m['tickets_worked_on'] for m in ranking], [2, 1])
+
+        top = self.client.get('/mechanics/ranking?limit=1').json
+        self.assertEqual([m['id'] for m in top], [jacob.id])
+
+        # Deleting a ticket takes it off every assigned mechanic's count
+        resp = self.client.delete(f'/service-tickets/{tickets[0].id}')
+        self.assertEqual(resp.status_code, 200)
+        ranking = self.client.get('/mechanics/ranking').json
+        self.assertEqual([m['tickets_worked_on'] for m in ranking], [1, 0])
@@ -0,0 +1,103 @@
+from Application import create_app
+from Application.models import db
+from Application.utils.rate_limits import SQLiteStorage, init_storage
+from flask import Flask
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+import unittest, tempfile, time, sys, os
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+class TestSQLiteStorage(unittest.TestCase):
+    def setUp(self):
+        """Create a throwaway limiter file"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.uri = 'sqlite:///' + os.path.join(self.tmpdir.name, 'ratelimit.sqlite3')
+        self.storage = storage_from_string(self.uri)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    # sqlite:// URIs resolve to the custom storage
+    def test_registered_scheme(self):
+        self.assertIsInstance(self.storage, SQLiteStorage)
+        self.assertTrue(self.storage.check())
+
+    # Two handles on the same file behave like two workers
+    def test_counters_shared_and_expire(self):
+        other = storage_from_string(self.uri)
+        self.assertEqual(self.storage.incr('k', 1), 1)
+        self.assertEqual(other.incr('k', 1), 2)
+        self.assertEqual(self.storage.get('k'), 2)
+        self.assertGreater(self.storage.get_expiry('k'), time.time())
+
+        time.sleep(1.1)
+        self.assertEqual(other.get('k'), 0)
+        self.assertEqual(other.incr('k', 1), 1)
+
+        self.storage.clear('k')
+        self.assertEqual(other.get('k'), 0)
+
+    # Both strategies enforce the limit through the storage
+    def test_strategies(self):
+        limit = parse('2/minute')
+        for limiter in (FixedWindowRateLimiter(self.storage), MovingWindowRateLimiter(self.storage)):
+            self.storage.reset()
+            self.assertTrue(limiter.hit(limit, 'client'))
+            self.assertTrue(limiter.hit(limit, 'client'))
+            self.assertFalse(limiter.hit(limit, 'client'))
+            self.assertEqual(limiter.get_window_stats(limit, 'client').remaining, 0)
+
+    # Finished windows of keys nobody hits again are swept, not kept forever
+    def test_expired_rows_pruned(self):
+        self.storage.PRUNE_INTERVAL = 5
+        for i in range(4):
+            self.storage.incr(f'gone{i}', 0)
+            self.storage.acquire_entry(f'gone{i}', 5, 0)
+        self.storage.incr('live', 60)
+        self.storage.acquire_entry('live', 5, 60)
+
+        conn = self.storage._conn()
+        self.assertEqual(conn.execute('SELECT key FROM counters').fetchall(), [('live',)])
+        self.assertEqual(conn.execute('SELECT key FROM events').fetchall(), [('live',)])
+        self.assertEqual(self.storage.get_moving_window('live', 5, 60)[1], 1)
+
+    # With no storage URI the file lands in the instance folder, wherever the app is started from
+    def test_default_file_in_instance_path(self):
+        app = Flask(__name__, instance_path=self.tmpdir.name)
+        init_storage(app)
+        storage = storage_from_string(app.config['RATELIMIT_STORAGE_URI'])
+        self.assertEqual(storage.path, os.path.join(self.tmpdir.name, 'ratelimit.sqlite3'))
+
+        app.config['RATELIMIT_STORAGE_URI'] = 'memory://'
+        init_storage(app)
+        self.assertEqual(app.config['RATELIMIT_STORAGE_URI'], 'memory://')
+
+class TestRouteLimits(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("TestConfig")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        try:
+            db.session.close()
+            db.drop_all()
+            self.app_context.pop()
+        except Exception as e:
+            print(f"Teardown warning: {e}")
+
+    # RATELIMIT_ROUTES overrides the limit written on the route
+    def test_configured_route_limit(self):
+        self.app.config['RATELIMIT_ROUTES'] = {'inventory.get_all_inventory': '1 per minute'}
+        self.assertEqual(self.client.get('/inventory').status_code, 200)
+        self.assertEqual(self.client.get('/inventory').status_code, 429)
+
+        # Other endpoints keep their defaults
+        self.assertEqual(self.client.get('/mechanics').status_code, 200)
+        self.assertEqual(self.client.get('/mechanics').status_code, 200)
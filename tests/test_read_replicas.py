@@ -0,0 +1,129 @@
+from Application.models import db, Base, Customers
+from Application.extensions import cache
+from Application.utils.read_replicas import pin_after_write, ReplicaHealth
+from Application.utils.cache_utils import cache_response, invalidate_cache_pattern, TAG_KEY_PREFIX
+from flask import Flask, jsonify
+from sqlalchemy import select, func
+from unittest import mock
+import unittest, tempfile, threading, sys, os
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+class TestReadReplicas(unittest.TestCase):
+    def make_app(self, replica_url):
+        """Small app with a primary and one replica, each its own SQLite file"""
+        app = Flask(__name__)
+        app.config.update(
+            SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(self.tmpdir.name, 'primary.db'),
+            SQLALCHEMY_BINDS={'replica_0': replica_url},
+            READ_REPLICAS=['replica_0'],
+            READ_REPLICA_PIN_SECONDS=5,
+            CACHE_TYPE='SimpleCache'
+        )
+        db.init_app(app)
+        cache.init_app(app)
+        app.after_request(pin_after_write)
+
+        @app.route('/count', methods=['GET', 'POST'])
+        def count():
+            return jsonify(db.session.execute(select(func.count()).select_from(Customers)).scalar_one())
+
+        @app.route('/cached-count')
+        @cache_response(timeout=60, tags=('counted',))
+        def cached_count():
+            return jsonify(db.session.execute(select(func.count()).select_from(Customers)).scalar_one())
+
+        return app
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = self.make_app('sqlite:///' + os.path.join(self.tmpdir.name, 'replica.db'))
+        with self.app.app_context():
+            db.create_all()
+            Base.metadata.create_all(db.engines['replica_0'])
+            # The row exists on the primary only, as if replication were behind
+            db.session.add(Customers(name="Primary Only", email="p@o.com", phone="1", password="x"))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        # init_app registered an empty metadata for the replica bind on the shared db;
+        # drop it so other test apps' create_all() does not look for that bind
+        db.metadatas.pop('replica_0', None)
+        self.tmpdir.cleanup()
+
+    # GETs read from the replica, other methods from the primary
+    def test_get_reads_from_replica(self):
+        client = self.app.test_client()
+        self.assertEqual(client.get('/count').json, 0)
+        self.assertEqual(client.post('/count').json, 1)
+
+    # A client that just wrote reads its own writes from the primary
+    def test_read_your_writes_pin(self):
+        client = self.app.test_client()
+        client.post('/count')
+        self.assertEqual(client.get('/count').json, 1)
+
+        # Another client is not pinned
+        other = self.app.test_client()
+        self.assertEqual(other.get('/count', environ_base={'REMOTE_ADDR': '10.0.0.2'}).json, 0)
+
+    # Behind a proxy, pins follow the forwarded client address, not the proxy's
+    def test_pin_uses_forwarded_address(self):
+        client = self.app.test_client()
+        proxy = {'REMOTE_ADDR': '10.0.0.1'}
+        client.post('/count', environ_base=proxy, headers={'X-Forwarded-For': '203.0.113.5'})
+        self.assertEqual(client.get('/count', environ_base=proxy, headers={'X-Forwarded-For': '203.0.113.5'}).json, 1)
+        self.assertEqual(client.get('/count', environ_base=proxy, headers={'X-Forwarded-For': '203.0.113.6'}).json, 0)
+
+    # A cache fill right after a tag bump reads the primary, not a lagging replica
+    def test_fill_after_bump_reads_primary(self):
+        client = self.app.test_client()
+        with self.app.app_context():
+            # A generation made long ago: the replica is trusted to have caught up
+            cache.set(f'{TAG_KEY_PREFIX}counted', 'aaaaaaaaaaaa-0')
+        self.assertEqual(client.get('/cached-count', environ_base={'REMOTE_ADDR': '10.0.0.3'}).json, 0)
+
+        with self.app.app_context():
+            invalidate_cache_pattern('counted')
+        self.assertEqual(client.get('/cached-count', environ_base={'REMOTE_ADDR': '10.0.0.3'}).json, 1)
+
+    # While one thread probes a replica, others use the primary instead of probing too
+    def test_one_probe_at_a_time(self):
+        health = ReplicaHealth()
+        started, finish = threading.Event(), threading.Event()
+        def slow_probe(key, engine):
+            started.set()
+            finish.wait(5)
+            return True
+
+        results = []
+        with self.app.app_context(), mock.patch.object(health, '_probe', side_effect=slow_probe) as probe:
+            def first():
+                with self.app.app_context():
+                    results.append(health.is_healthy('replica_0', None))
+
+            prober = threading.Thread(target=first)
+            prober.start()
+            started.wait(5)
+            self.assertFalse(health.is_healthy('replica_0', None))
+            finish.set()
+            prober.join()
+            self.assertEqual(results, [True])
+            self.assertTrue(health.is_healthy('replica_0', None))
+            self.assertEqual(probe.call_count, 1)
+
+    # An unreachable replica falls back to the primary
+    def test_unhealthy_replica_falls_back(self):
+        app = self.make_app('sqlite:///' + os.path.join(self.tmpdir.name, 'missing', 'replica.db'))
+        try:
+            self.assertEqual(app.test_client().get('/count').json, 1)
+        finally:
+            with app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
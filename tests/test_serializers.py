@@ -0,0 +1,164 @@
+from Application import create_app
+from Application.models import db, Customers, Service_Tickets, Mechanics, Inventory
+from Application.utils.serializers import RowSerializer, _json_float
+from Application.Blueprints.customers.schemas import customers_schema, customers_serializer
+from Application.Blueprints.inventory.schemas import inventories_schema, inventories_serializer
+from Application.Blueprints.mechanics.schemas import mechanics_schema, mechanics_serializer
+from Application.Blueprints.service_tickets.schemas import tickets_schema, tickets_serializer
+from marshmallow import fields
+from sqlalchemy import select, update
+import unittest, json, sys, os
+
+# Add project root to Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+# (schema, serializer, model) for every list endpoint
+PAIRS = [
+    (customers_schema, customers_serializer, Customers),
+    (inventories_schema, inventories_serializer, Inventory),
+    (mechanics_schema, mechanics_serializer, Mechanics),
+    (tickets_schema, tickets_serializer, Service_Tickets)
+]
+
+class TestRowSerializers(unittest.TestCase):
+    def setUp(self):
+        """Seed rows with the values most likely to expose a difference"""
+        self.app = create_app("TestConfig")
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        awkward = ['Zoë "Q" O\'Neil', 'tab\there\nnew line', 'emoji \U0001F697 ☃', 'back\\slash </script>', '']
+        customers = [Customers(name=name, email=f'c{i}@x.com', phone=f'555-{i}', password='x')
+                     for i, name in enumerate(awkward)]
+        db.session.add_all(customers)
+        db.session.add_all(Mechanics(name=name, email=f'm{i}@x.com', phone=f'666-{i}', salary=salary)
+                           for i, (name, salary) in enumerate(zip(awkward, [0.1, 1e16, 1e-05, 123456.789, -0.0])))
+        db.session.add_all(Inventory(name=name, price=price)
+                           for name, price in zip(awkward, [19.99, 0.0, 1.5e-7, 3.0, 2.675]))
+        db.session.commit()
+        db.session.add_all(Service_Tickets(VIN=f'VIN{i}', service_date=f'202{i}-0{i + 1}-1{i}', service_desc=desc,
+                                           customer_id=customers[i].id)
+                           for i, desc in enumerate(awkward))
+        db.session.commit()
+
+    def tearDown(self):
+        try:
+            db.session.close()
+            db.drop_all()
+            self.app_context.pop()
+        except Exception as e:
+            print(f"Teardown warning: {e}")
+
+    def fetch(self, serializer, model):
+        rows = db.session.execute(select(*serializer.columns).order_by(model.id)).all()
+        objects = db.session.execute(select(model).order_by(model.id)).scalars().all()
+        return rows, objects
+
+    # dump() matches schema.dump() value for value, type for type, key for key
+    def test_dump_matches_schema(self):
+        for schema, serializer, model in PAIRS:
+            with self.subTest(model=model.__name__):
+                rows, objects = self.fetch(serializer, model)
+                expected = schema.dump(objects)
+                actual = serializer.dump(rows)
+                self.assertEqual(actual, expected)
+                self.assertEqual([list(d) for d in actual], [list(d) for d in expected])
+                self.assertEqual([[type(v) for v in d.values()] for d in actual],
+                                 [[type(v) for v in d.values()] for d in expected])
+
+    # jsonify() writes the same bytes as schema.jsonify(), indented and compact
+    def test_jsonify_byte_identical(self):
+        for debug in (True, False):
+            self.app.debug = debug
+            for schema, serializer, model in PAIRS:
+                with self.subTest(model=model.__name__, debug=debug), self.app.test_request_context():
+                    rows, objects = self.fetch(serializer, model)
+                    self.assertEqual(serializer.jsonify(rows).get_data(), schema.jsonify(objects).get_data())
+                    self.assertEqual(serializer.jsonify(rows[:1]).get_data(), schema.jsonify(objects[:1]).get_data())
+                    self.assertEqual(serializer.jsonify([]).get_data(), schema.jsonify([]).get_data())
+
+    # Nulls in nullable columns come out as null / None
+    def test_null_values(self):
+        serializer = RowSerializer(tickets_schema)
+        row = (None,) * len(serializer.columns)
+        self.assertEqual(serializer.to_dict(row), dict.fromkeys(serializer.keys))
+        with self.app.test_request_context():
+            self.assertEqual(json.loads(serializer.jsonify([row]).get_data()), [dict.fromkeys(serializer.keys)])
+
+    # Non-finite floats are spelled the way json.dumps spells them
+    def test_non_finite_floats(self):
+        for value in (float('nan'), float('inf'), float('-inf'), 1e300, 5e-324):
+            self.assertEqual(_json_float(value), json.dumps(value))
+
+    # Fields it cannot reproduce exactly are refused up front
+    def test_unsupported_field(self):
+        class EmailSchema(customers_schema.__class__):
+            email = fields.Email()
+
+        with self.assertRaises(TypeError):
+            RowSerializer(EmailSchema(many=True))
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app("TestConfig")
+        self.app.config['STREAM_BATCH_SIZE'] = 2
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        db.session.add_all(Inventory(name=f'Part {i}', price=i + 0.5) for i in range(5))
+        db.session.commit()
+
+    def tearDown(self):
+        try:
+            db.session.close()
+            db.drop_all()
+            self.app_context.pop()
+        except Exception as e:
+            print(f"Teardown warning: {e}")
+
+    def lines(self, response):
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    # ?stream=1 sends every row, past the page limit, one object per line
+    def test_stream_query_param(self):
+        response = self.client.get('/inventory?stream=1&limit=1&sort=-price')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual([item['name'] for item in self.lines(response)], [f'Part {i}' for i in range(4, -1, -1)])
+
+    # Accept: application/x-ndjson does the same, with the list's filters applied
+    def test_stream_accept_header(self):
+        response = self.client.get('/inventory?min_price=2', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual([item['price'] for item in self.lines(response)], [2.5, 3.5, 4.5])
+
+        response = self.client.get('/customers', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(), b'')
+
+    # Streams are never cached, and do not poison the cached JSON page
+    def test_stream_bypasses_cache(self):
+        self.client.get('/service-tickets?stream=1')
+        response = self.client.get('/service-tickets')
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.get_json(), [])
+
+        response = self.client.get('/service-tickets?stream=1')
+        self.assertTrue(response.is_streamed)
+
+    # Endpoints that never stream keep caching when a client asks for NDJSON
+    def test_non_streaming_endpoint_cached(self):
+        headers = {'Accept': 'application/x-ndjson'}
+        item_id = db.session.execute(select(Inventory.id)).scalars().first()
+        self.client.get(f'/inventory/{item_id}', headers=headers)
+        db.session.execute(update(Inventory).where(Inventory.id == item_id).values(name='Changed behind the cache'))
+        db.session.commit()
+
+        response = self.client.get(f'/inventory/{item_id}', headers=headers)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.get_json()['name'], 'Part 0')
@@ -2,8 +2,11 @@ from Application import create_app
 from Application.models import  db, Mechanics, Customers, Service_Mechanics, Service_Tickets, Inventory, Service_Inventory
 from datetime import datetime
 from Application.utils.token_utils import encode_token
+from Application.utils.pagination import encode_cursor
+from Application.utils.cache_utils import TAG_KEY_PREFIX
+from Application.extensions import cache
 import unittest, json, sys, os
-from sqlalchemy import select
+from sqlalchemy import select, event
 
 # Add project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -130,6 +133,31 @@ class TestServiceTickets(unittest.TestCase):
         self.assertGreaterEqual(len(tickets), 1)
         self.assertEqual(tickets[0]['VIN'], "A8E7W8U2")
 
+    # The date range filters, and a malformed date is rejected instead of ignored
+    def test_ticket_date_filters(self):
+        response = self.client.get('/service-tickets?service_date_from=2023-01-01')
+        self.assertEqual([t['VIN'] for t in response.json], ["C3T2V1N2"])
+        response = self.client.get('/service-tickets?service_date_to=2023-01-01')
+        self.assertEqual([t['VIN'] for t in response.json], ["A8E7W8U2"])
+
+        for bad in ('service_date_from=yesterday', 'service_date_to=2023-13-01'):
+            response = self.client.get(f'/service-tickets?{bad}')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(bad.split('=')[0], response.json['error'])
+
+    # A forged or corrupted cursor is a 400, never a 500
+    def test_bad_cursor_rejected(self):
+        for values in (['service_date', 'not-a-date', 1], ['service_date', 20230101, 1],
+                       ['customer_id', 'one', 1], ['service_date', '2023-01-01', True]):
+            with self.subTest(values=values):
+                response = self.client.get(f'/service-tickets?sort={values[0]}&after={encode_cursor(values)}')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json['error'], 'Invalid cursor')
+
+        # A well-formed one still pages
+        cursor = encode_cursor(['service_date', '2023-01-01', 1])
+        self.assertEqual(self.client.get(f'/service-tickets?sort=service_date&after={cursor}').status_code, 200)
+
     # Test to add, then remove a mechanic from a service ticket
     def test_add_remove_mechanic(self):
         # Create two test mechanics
@@ -141,7 +169,7 @@ class TestServiceTickets(unittest.TestCase):
         # Create a ticket for the existing customer
         ticket = Service_Tickets(
             VIN= f"EDITVIN-{mech1.email}",
-            service_date="2025.10.03",
+            service_date="2025-10-03",
             service_desc="Edit test ticket",
             customer_id=self.test_customer.id 
         )
@@ -197,6 +225,100 @@ class TestServiceTickets(unittest.TestCase):
         db.session.delete(mech2)
         db.session.commit()
 
+    # A bulk edit only reports real changes and is all-or-nothing
+    def test_edit_mechanics_set_based(self):
+        mechs = [Mechanics(name=f"Bulk Mech {i}", email=f"bulk{i}@test.com", phone=f"700-000-000{i}", salary=50000.0)
+                 for i in range(3)]
+        db.session.add_all(mechs)
+        db.session.commit()
+        ticket_id = db.session.execute(select(Service_Tickets.id)).scalars().first()
+        db.session.add(Service_Mechanics(ticket_id=ticket_id, mechanic_id=mechs[0].id))
+        db.session.commit()
+        ids = [m.id for m in mechs]
+
+        # An unknown mechanic in add_ids fails before anything is removed
+        resp = self.client.put(f'/service-tickets/{ticket_id}/edit',
+                               json={"remove_ids": [ids[0]], "add_ids": [ids[1], 9999]})
+        self.assertEqual(resp.status_code, 404)
+        self.assertIn('9999', resp.json['error'])
+        assigned = db.session.execute(
+            select(Service_Mechanics.mechanic_id).where(Service_Mechanics.ticket_id == ticket_id)
+        ).scalars().all()
+        self.assertEqual(assigned, [ids[0]])
+
+        # Already-assigned adds and unassigned removes are left out of the response
+        resp = self.client.put(f'/service-tickets/{ticket_id}/edit',
+                               json={"remove_ids": [ids[2]], "add_ids": [ids[0], ids[1], ids[2]]})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json['removed_mechanics'], [])
+        self.assertEqual(resp.json['added_mechanics'], [ids[1], ids[2]])
+
+        resp = self.client.put(f'/service-tickets/{ticket_id}/edit', json={"add_ids": ["x"]})
+        self.assertEqual(resp.status_code, 400)
+
+    # ticket_count follows the rows that were really inserted and deleted
+    def test_edit_and_delete_keep_counts_exact(self):
+        mech = Mechanics(name="Count Mech", email="count@test.com", phone="700-222-0000", salary=50000.0)
+        db.session.add(mech)
+        db.session.commit()
+        ticket_id = db.session.execute(select(Service_Tickets.id)).scalars().first()
+
+        self.client.put(f'/service-tickets/{ticket_id}/assign-mechanic/{mech.id}')
+        # Adding the pair again is skipped, not a 500, and removing twice counts once
+        resp = self.client.put(f'/service-tickets/{ticket_id}/edit', json={"add_ids": [mech.id]})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json['added_mechanics'], [])
+        self.client.put(f'/service-tickets/{ticket_id}/edit', json={"remove_ids": [mech.id]})
+        resp = self.client.put(f'/service-tickets/{ticket_id}/edit', json={"remove_ids": [mech.id]})
+        self.assertEqual(resp.json['removed_mechanics'], [])
+        db.session.refresh(mech)
+        self.assertEqual(mech.ticket_count, 0)
+
+        self.client.put(f'/service-tickets/{ticket_id}/edit', json={"add_ids": [mech.id]})
+        self.assertEqual(self.client.delete(f'/service-tickets/{ticket_id}').status_code, 200)
+        db.session.refresh(mech)
+        self.assertEqual(mech.ticket_count, 0)
+
+    # Adding mechanics costs the same statements for one id as for twenty
+    def test_edit_mechanics_constant_statements(self):
+        db.session.add_all(Mechanics(name=f"Bulk {i}", email=f"bulk{i}@test.com", phone=f"700-333-00{i:02}", salary=1.0)
+                           for i in range(21))
+        db.session.commit()
+        ids = db.session.execute(select(Mechanics.id).order_by(Mechanics.id)).scalars().all()[-21:]
+        first, second = db.session.execute(select(Service_Tickets.id)).scalars().all()[:2]
+
+        one, few = self.count_queries(f'/service-tickets/{first}/edit', 'PUT', json={"add_ids": ids[:1]})
+        many, lots = self.count_queries(f'/service-tickets/{second}/edit', 'PUT', json={"add_ids": ids[1:]})
+        self.assertEqual(len(one.json['added_mechanics']), 1)
+        self.assertEqual(len(many.json['added_mechanics']), 20)
+        self.assertEqual(few, lots)
+
+        # Ids already on the ticket are skipped in the same statement
+        again = self.client.put(f'/service-tickets/{second}/edit', json={"add_ids": ids[:3]})
+        self.assertEqual(again.json['added_mechanics'], [ids[0]])
+
+    # A second ticket for the same VIN is rejected
+    def test_duplicate_vin(self):
+        payload = dict(self.test_ticket1, customer_id=self.test_customer.id)
+        response = self.client.post('/service-tickets', json=payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['error'], "VIN already associated with a service ticket")
+
+    # Assigning the same mechanic twice is rejected and counted once
+    def test_assign_mechanic_twice(self):
+        mech = Mechanics(name="Twice Mech", email="twice@test.com", phone="700-111-0000", salary=50000.0)
+        db.session.add(mech)
+        db.session.commit()
+        ticket_id = db.session.execute(select(Service_Tickets.id)).scalars().first()
+
+        first = self.client.put(f'/service-tickets/{ticket_id}/assign-mechanic/{mech.id}')
+        self.assertEqual(first.status_code, 200)
+        second = self.client.put(f'/service-tickets/{ticket_id}/assign-mechanic/{mech.id}')
+        self.assertEqual(second.status_code, 400)
+
+        db.session.refresh(mech)
+        self.assertEqual(mech.ticket_count, 1)
+
     # Test add a part to a service ticket
     def test_add_part(self):
         # Create an inventory item
@@ -253,4 +375,152 @@ class TestServiceTickets(unittest.TestCase):
             )
         ).scalars().first()
         self.assertIsNotNone(rel_after)
-        self.assertEqual(rel_after.quantity, 5)
\ No newline at end of file
+        self.assertEqual(rel_after.quantity, 5)
+
+    # Conditional GET on the cached ticket list
+    def test_tickets_etag_not_modified(self):
+        first = self.client.get('/service-tickets')
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers.get('ETag')
+        self.assertIsNotNone(etag)
+        self.assertIn('must-revalidate', first.headers.get('Cache-Control'))
+
+        # Unchanged list answers with a bodyless 304
+        second = self.client.get('/service-tickets', headers={'If-None-Match': etag})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+        self.assertEqual(second.headers.get('ETag'), etag)
+
+        # A write changes the list, so the old ETag no longer matches
+        payload = {
+            "VIN": "ETAGVIN001",
+            "service_date": "2025-01-15",
+            "service_desc": "ETag test",
+            "customer_id": self.test_customer.id
+        }
+        self.assertEqual(self.client.post('/service-tickets', json=payload).status_code, 201)
+        third = self.client.get('/service-tickets', headers={'If-None-Match': etag})
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third.headers.get('ETag'), etag)
+
+    # ?fields= returns only those fields, and pages still chain through the cursor
+    def test_sparse_fieldsets(self):
+        first = self.client.get('/service-tickets?fields=VIN&sort=-service_date&limit=1')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json, [{'VIN': 'C3T2V1N2'}])
+
+        second = self.client.get(f"/service-tickets?fields=VIN&sort=-service_date&limit=1&after={first.headers['X-Next-Cursor']}")
+        self.assertEqual(second.json, [{'VIN': 'A8E7W8U2'}])
+
+        # Order in the list does not matter, to the response or to the cache
+        self.assertEqual(self.client.get('/service-tickets?fields=id,VIN').json,
+                         self.client.get('/service-tickets?fields=VIN,id').json)
+
+        bad = self.client.get('/service-tickets?fields=VIN,owner')
+        self.assertEqual(bad.status_code, 400)
+        self.assertIn('owner', bad.json['error'])
+
+    def count_queries(self, url, method='GET', **kwargs):
+        """Request url, returning the response and the number of SQL statements it ran"""
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.open(url, method=method, **kwargs)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        return response, len(statements)
+
+    def add_mechanics_and_parts(self):
+        tickets = db.session.execute(select(Service_Tickets)).scalars().all()
+        for i in range(3):
+            db.session.add(Mechanics(name=f"Eager {i}", email=f"eager{i}@shop.com", phone=f"555-000-00{i}", salary=50000.0))
+            db.session.add(Inventory(name=f"Part {i}", price=10.0 + i))
+        db.session.commit()
+        for ticket in tickets:
+            for i in (1, 2):
+                db.session.add(Service_Mechanics(ticket_id=ticket.id, mechanic_id=i))
+                db.session.add(Service_Inventory(ticket_id=ticket.id, inventory_id=i + 1, quantity=i))
+        db.session.commit()
+        return tickets
+
+    # A page of tickets with mechanics and parts takes three queries, however many rows it has
+    def test_expand_query_count(self):
+        self.add_mechanics_and_parts()
+
+        response, queries = self.count_queries('/service-tickets?expand=parts,mechanics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 3)
+        self.assertEqual(len(response.json), 2)
+        for ticket in response.json:
+            self.assertEqual([m['id'] for m in ticket['mechanics']], [1, 2])
+            self.assertEqual([(p['id'], p['quantity']) for p in ticket['parts']], [(2, 1), (3, 2)])
+
+        response, queries = self.count_queries('/service-tickets?expand=mechanics&fields=VIN&limit=1')
+        self.assertEqual(queries, 2)
+        self.assertEqual(set(response.json[0]), {'VIN', 'mechanics'})
+        self.assertIn('X-Next-Cursor', response.headers)
+
+        bad = self.client.get('/service-tickets?expand=customer')
+        self.assertEqual(bad.status_code, 400)
+
+    # The detail endpoint expands both by default
+    def test_get_ticket_detail(self):
+        tickets = self.add_mechanics_and_parts()
+
+        response, queries = self.count_queries(f'/service-tickets/{tickets[0].id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 3)
+        self.assertEqual(response.json['VIN'], 'A8E7W8U2')
+        self.assertEqual(len(response.json['mechanics']), 2)
+        self.assertEqual(response.json['parts'][0]['name'], 'Part 1')
+
+        plain = self.client.get(f'/service-tickets/{tickets[0].id}?expand=')
+        self.assertNotIn('mechanics', plain.json)
+        self.assertEqual(self.client.get('/service-tickets/999').status_code, 404)
+
+        # A renamed part shows up in the cached detail
+        self.assertEqual(self.client.put('/inventory/2', json={'name': 'Renamed', 'price': 11.0}).status_code, 200)
+        self.assertEqual(self.client.get(f'/service-tickets/{tickets[0].id}').json['parts'][0]['name'], 'Renamed')
+
+    # Totals are summed in SQL, cached per ticket and dropped when a part or its price changes
+    def test_ticket_totals(self):
+        first, second = self.add_mechanics_and_parts()
+
+        # Part 1 (11.0) x 1 + Part 2 (12.0) x 2 on both tickets; the parts are read, then summed
+        response, queries = self.count_queries(f'/service-tickets/{first.id}/total')
+        self.assertEqual(response.json, {'ticket_id': first.id, 'total': 35.0})
+        self.assertEqual(queries, 2)
+        self.assertEqual(self.count_queries(f'/service-tickets/{first.id}/total')[1], 0)
+
+        # Only the uncached ticket is summed, in one grouped query
+        response, queries = self.count_queries(f'/service-tickets/totals?ids={first.id},{second.id},999')
+        self.assertEqual(queries, 2)
+        self.assertEqual(response.json['totals'], [{'ticket_id': first.id, 'total': 35.0},
+                                                   {'ticket_id': second.id, 'total': 35.0}])
+        self.assertEqual(response.json['not_found'], [999])
+
+        # Probing unknown ids leaves no tag generation behind
+        self.client.get('/service-tickets/998/total')
+        self.assertIsNone(cache.get(f'{TAG_KEY_PREFIX}ticket_total:998'))
+        self.assertIsNone(cache.get(f'{TAG_KEY_PREFIX}ticket_total:999'))
+
+        # A price change is one tag bump, however many tickets use the part
+        update, queries = self.count_queries('/inventory/2', 'PUT', json={'name': 'Part 1', 'price': 20.0})
+        self.assertEqual(update.status_code, 200)
+        # Load, UPDATE and the reload for the response; no look-up of the tickets using it
+        self.assertEqual(queries, 3)
+        self.client.post(f'/service-tickets/{second.id}/add-part', json={'inventory_id': 1, 'quantity': 2})
+        response = self.client.get(f'/service-tickets/totals?ids={first.id},{second.id}')
+        self.assertEqual([t['total'] for t in response.json['totals']], [44.0, 64.0])
+
+        self.assertEqual(self.client.get('/service-tickets/999/total').status_code, 404)
+        self.assertEqual(self.client.get('/service-tickets/totals?ids=1,x').status_code, 400)
+
+        # The id limit counts distinct ids
+        self.app.config['PAGINATION_MAX_LIMIT'] = 2
+        repeated = ','.join([str(first.id)] * 5)
+        self.assertEqual(self.client.get(f'/service-tickets/totals?ids={repeated}').status_code, 200)
+        self.assertEqual(self.client.get('/service-tickets/totals?ids=1,2,3').status_code, 400)